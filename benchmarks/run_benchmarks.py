@@ -0,0 +1,217 @@
+"""Benchmarks graph construction, traversals, translation and serialization over the example models.
+
+Every model runs in its own process so peak RSS is measured per model. Results are written as
+JSON, with --baseline they are compared against a stored run and regressions beyond the
+thresholds make the script exit with status 1.
+
+    python benchmarks/run_benchmarks.py --output results.json --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline benchmarks/baseline.json
+
+Times and RSS depend on the machine, so no baseline is kept in the repository. The baseline
+is made with --update-baseline on the machine that runs the gate and stored there (or as a
+CI artifact restored before the run), then every later run on that machine is compared to
+it with --baseline. A run on another platform than the baseline's only warns. Update the
+baseline when a slowdown is accepted.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(REPO_ROOT, 'examples', 'metadata_generator', 'data')
+TIMED_STAGES = ('load_model', 'graph_build', 'traversals', 'translate', 'serialize')
+COUNTS = ('model_lines', 'graph_nodes', 'graph_edges', 'meta_nodes', 'points')
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def timed(timings, stage, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+
+def traverse_loops(graph):
+    import openstudio
+    contexts = 0
+    for node in graph.get_nodes_by_type(openstudio.IddObjectType('OS:AirloopHVAC')):
+        loop_object = graph.get_object_from_node(node)
+        graph.get_downstream_subgraph(loop_object.supplyInletNode(), stop_at_nodes=[node], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
+        demand_context = graph.get_downstream_subgraph(loop_object.demandInletNode(), stop_at_nodes=[node])
+        contexts += 2
+        for zone in demand_context.get_nodes_by_type(openstudio.IddObjectType('OS:ThermalZone')):
+            demand_context.get_upstream_subgraph(zone, stop_at_types=[openstudio.IddObjectType('OS:AirLoopHVAC:ZoneSplitter')])
+            contexts += 1
+    for node in graph.get_nodes_by_type(openstudio.IddObjectType('OS:PlantLoop')):
+        plant_object = graph.get_object_from_node(node)
+        graph.get_downstream_subgraph(plant_object.supplyInletNode(), stop_at_nodes=[node], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
+        graph.get_downstream_subgraph(plant_object.demandInletNode(), stop_at_nodes=[node])
+        contexts += 2
+    return contexts
+
+
+def benchmark_model(path, repeat=1):
+    """Runs every stage on path repeat times in this process, the fastest time of each stage is kept."""
+    # the package is benchmarked from the checkout rather than from an installed copy
+    sys.path.insert(0, REPO_ROOT)
+    import openstudio
+    import tasty.constants as tc
+    import tasty.graphs as tg
+    from openstudio_metadata_utility.openstudio_graph import OpenStudioGraph
+    from openstudio_metadata_utility.translator import Translator, load_definitions
+
+    result = {'model': os.path.splitext(os.path.basename(path))[0], 'path': path}
+    with open(path) as model_file:
+        result['model_lines'] = sum(1 for _ in model_file)
+
+    definitions_start = time.perf_counter()
+    load_definitions()
+    result['load_definitions_seconds'] = time.perf_counter() - definitions_start
+
+    best = {}
+    for _ in range(repeat):
+        timings = {}
+        model = timed(timings, 'load_model', lambda: openstudio.model.Model.load(openstudio.path(path)).get())
+        graph = timed(timings, 'graph_build', OpenStudioGraph, model)
+        result['contexts'] = timed(timings, 'traversals', traverse_loops, graph)
+
+        translator = Translator()
+        timed(timings, 'translate', translator.translate, model, result['model'], apply_points=False)
+
+        def serialize():
+            translator.write_brick(io.StringIO(), 'turtle')
+            tg.graph_to_hayson_string(translator.graphs[(tc.HAYSTACK, tc.V3_9_10)])
+        timed(timings, 'serialize', serialize)
+
+        for stage, seconds in timings.items():
+            best[stage] = min(seconds, best.get(stage, seconds))
+        result['graph_nodes'] = graph.number_of_nodes()
+        result['graph_edges'] = graph.number_of_edges()
+        result['meta_nodes'] = len(translator.nodes)
+        result['points'] = len(translator.manifest)
+
+    for stage in TIMED_STAGES:
+        result[f'{stage}_seconds'] = best[stage]
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def run_in_subprocess(path, repeat):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--worker', path, '--worker-output', output_path, '--repeat', str(repeat)]
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            return {'model': os.path.splitext(os.path.basename(path))[0], 'path': path, 'error': completed.stderr}
+        with open(output_path) as output:
+            return json.load(output)
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """Regressions of results against baseline as human readable strings.
+
+    Times and peak RSS regress when they grow by more than the threshold fraction, the counts
+    must match exactly since they describe the translation output rather than its cost.
+    """
+    baseline_models = {result['model']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        reference = baseline_models.get(result['model'])
+        if reference is None or 'error' in reference:
+            continue
+        if 'error' in result:
+            regressions.append(f"{result['model']}: failed")
+            continue
+        for stage in TIMED_STAGES:
+            key = f'{stage}_seconds'
+            if result[key] > reference[key] * (1 + time_threshold):
+                regressions.append(f"{result['model']}: {key} {reference[key]:.3f} -> {result[key]:.3f}")
+        if result['peak_rss_bytes'] > reference['peak_rss_bytes'] * (1 + memory_threshold):
+            regressions.append(f"{result['model']}: peak_rss_bytes {reference['peak_rss_bytes']} -> {result['peak_rss_bytes']}")
+        for key in COUNTS:
+            if result[key] != reference[key]:
+                regressions.append(f"{result['model']}: {key} {reference[key]} -> {result[key]}")
+    return regressions
+
+
+def format_results(results):
+    columns = ('model_lines', 'graph_nodes', 'points') + tuple(f'{stage}_seconds' for stage in TIMED_STAGES)
+    lines = [f"{'model':<28}" + ''.join(f"{column.replace('_seconds', ''):>14}" for column in columns) + f"{'peak MiB':>10}"]
+    for result in sorted(results, key=lambda result: result.get('model_lines', 0)):
+        if 'error' in result:
+            lines.append(f"{result['model']:<28} failed")
+            continue
+        row = f"{result['model']:<28}"
+        for column in columns:
+            row += f"{result[column]:>14.3f}" if column.endswith('_seconds') else f"{result[column]:>14}"
+        lines.append(row + f"{result['peak_rss_bytes'] / 2**20:>10.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the metadata translation over the example models.")
+    parser.add_argument('models', nargs='*', help=".osm files to benchmark, defaults to the example models")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per model, the fastest time of each stage is kept")
+    parser.add_argument('--output', default=None, help="write the results as JSON to this file")
+    parser.add_argument('--baseline', default=None, help="compare against the results stored in this file")
+    parser.add_argument('--update-baseline', default=None, help="store the results as the new baseline in this file")
+    parser.add_argument('--time-threshold', type=float, default=0.2, help="allowed fractional slowdown of a stage before it counts as a regression")
+    parser.add_argument('--memory-threshold', type=float, default=0.2, help="allowed fractional growth of the peak RSS")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-output', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        with open(args.worker_output, 'w') as output:
+            json.dump(benchmark_model(args.worker, args.repeat), output)
+        return 0
+
+    models = args.models
+    if not models:
+        models = sorted(os.path.join(DEFAULT_DATA_DIR, file) for file in os.listdir(DEFAULT_DATA_DIR) if file.endswith('.osm'))
+    results = [run_in_subprocess(os.path.abspath(model), args.repeat) for model in models]
+    print(format_results(results))
+    for result in results:
+        if 'error' in result:
+            print(f"\n{result['path']}:\n{result['error']}", file=sys.stderr)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(), 'repeat': args.repeat, 'results': results}
+    if args.output is not None:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=1)
+    if args.update_baseline is not None:
+        with open(args.update_baseline, 'w') as output:
+            json.dump(report, output, indent=1)
+
+    if args.baseline is not None:
+        if not os.path.exists(args.baseline):
+            print(f"\nno baseline at {args.baseline}, create it with --update-baseline {args.baseline}", file=sys.stderr)
+            return 2
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('platform') != report['platform']:
+            print(f"\nwarning: baseline was measured on {baseline.get('platform')}, this run is on {report['platform']}", file=sys.stderr)
+        regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nno regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import openstudio
+import tasty.constants as tc
+import tasty.graphs as tg
+
+# One translator per worker process so the ontologies are only loaded once per worker
+_worker_translator = None
+
+
+def _init_worker(definitions_snapshot=None, cache_dir=None, profile=False, track_memory=False):
+    global _worker_translator
+    from openstudio_metadata_utility.translator import Translator, load_definitions
+    load_definitions(definitions_snapshot)
+    _worker_translator = Translator(definitions_snapshot, cache_dir, profile=profile, track_memory=track_memory)
+
+
+def building_name_from_path(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def find_models(directory):
+    return sorted(os.path.join(directory, file) for file in os.listdir(directory) if file.endswith('.osm'))
+
+
+def write_outputs(translator, building_name, output_dir):
+    building_dir = os.path.join(output_dir, building_name)
+    os.makedirs(building_dir, exist_ok=True)
+    brick_path = os.path.join(building_dir, f"{building_name}_brick.ttl")
+    haystack_path = os.path.join(building_dir, f"{building_name}_haystack.json")
+    translator.write_brick(brick_path, 'turtle')
+    with open(haystack_path, 'w') as out, translator.profile_stage('serialization'):
+        out.write(tg.graph_to_hayson_string(translator.graphs[(tc.HAYSTACK, tc.V3_9_10)]))
+    points_path = os.path.join(building_dir, f"{building_name}_points.json")
+    with open(points_path, 'w') as points_file:
+        json.dump(translator.manifest, points_file, indent=1)
+    outputs = [brick_path, haystack_path, points_path]
+    if translator.profiler is not None:
+        profile_path = os.path.join(building_dir, f"{building_name}_profile.json")
+        translator.profiler.write_json(profile_path)
+        outputs.append(profile_path)
+    return outputs
+
+
+def translate_file(path, output_dir, translator=None):
+    if translator is None:
+        from openstudio_metadata_utility.translator import Translator
+        translator = Translator()
+    building_name = building_name_from_path(path)
+    if translator.profiler is not None:
+        # workers reuse their translator, each building gets its own report
+        translator.reset_profiler()
+    model = openstudio.model.Model.load(openstudio.path(str(path))).get()
+    # the model is discarded afterwards, so the points are only written to the manifest
+    translator.translate(model, building_name, apply_points=False)
+    return write_outputs(translator, building_name, output_dir)
+
+
+def _translate_job(path, output_dir):
+    start = time.perf_counter()
+    result = {'path': path, 'building': building_name_from_path(path)}
+    try:
+        result['outputs'] = translate_file(path, output_dir, _worker_translator)
+        result['status'] = 'ok'
+    except Exception:
+        # isolate failures to the file that caused them
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def translate_batch(paths, output_dir='outputs', workers=None, definitions_snapshot=None, cache_dir=None, profile=False, track_memory=False):
+    paths = [str(path) for path in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = []
+    if workers <= 1:
+        _init_worker(definitions_snapshot, cache_dir, profile, track_memory)
+        for path in paths:
+            results.append(_translate_job(path, output_dir))
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths) or 1), initializer=_init_worker, initargs=(definitions_snapshot, cache_dir, profile, track_memory)) as pool:
+        futures = {pool.submit(_translate_job, path, output_dir): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception:
+                # the worker process died (e.g. a crash in the OpenStudio bindings), which fails every job still in the pool
+                path = futures[future]
+                results.append({'path': path, 'building': building_name_from_path(path), 'status': 'error', 'error': traceback.format_exc(), 'seconds': 0.0})
+    order = {path: i for i, path in enumerate(paths)}
+    results.sort(key=lambda result: order[result['path']])
+    return results
+
+
+def format_summary(results, wall_seconds=None):
+    lines = []
+    name_width = max([len(result['building']) for result in results] + [len('building')])
+    lines.append(f"{'building':<{name_width}}  {'status':<6}  {'seconds':>8}")
+    for result in results:
+        lines.append(f"{result['building']:<{name_width}}  {result['status']:<6}  {result['seconds']:>8.2f}")
+    failed = [result for result in results if result['status'] != 'ok']
+    summary = f"{len(results) - len(failed)} translated, {len(failed)} failed"
+    if wall_seconds is not None:
+        summary += f" in {wall_seconds:.2f}s"
+    lines.append(summary)
+    for result in failed:
+        lines.append(f"\n{result['path']}:\n{result['error']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate OpenStudio models to Brick and Haystack in parallel.")
+    parser.add_argument('inputs', nargs='+', help=".osm files or directories containing them")
+    parser.add_argument('-o', '--output-dir', default='outputs', help="directory the per building outputs are written to")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="number of worker processes, defaults to the cpu count")
+    parser.add_argument('--definitions-snapshot', default=None, help="pickle file caching the parsed ontologies and bound definitions between runs")
+    parser.add_argument('--cache', default=None, help="directory of cached translation results keyed on model content")
+    parser.add_argument('--report', default=None, help="also write the summary as JSON to this file")
+    parser.add_argument('--profile', action='store_true', help="write per stage, air loop and plant loop timings to <building>_profile.json")
+    parser.add_argument('--profile-memory', action='store_true', help="with --profile, also record memory peaks from an extra translation pass per building")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            paths.extend(find_models(path))
+        else:
+            paths.append(path)
+
+    start = time.perf_counter()
+    results = translate_batch(paths, args.output_dir, args.workers, args.definitions_snapshot, args.cache, args.profile, args.profile_memory)
+    wall_seconds = time.perf_counter() - start
+    print(format_summary(results, wall_seconds))
+    if args.report is not None:
+        with open(args.report, 'w') as out:
+            json.dump({'wall_seconds': wall_seconds, 'results': results}, out, indent=2)
+    return 0 if all(result['status'] == 'ok' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+
+import openstudio
+import tasty.constants as tc
+import tasty.graphs as tg
+
+import openstudio_metadata_utility
+from openstudio_metadata_utility.topology_cache import model_content_hash
+
+GRAPH_FILES = {
+    (tc.HAYSTACK, tc.V3_9_10): 'haystack.ttl',
+    (tc.BRICK, tc.V1_2_1): 'brick.ttl',
+}
+POINTS_FILE = 'points.json'
+# bump when the translation rules or the layout of an entry change, __version__ is not bumped for those
+CACHE_FORMAT = 1
+
+
+def tasty_version():
+    try:
+        return importlib.metadata.version('tasty')
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def add_idf_objects(model, object_texts):
+    idf_objects = openstudio.IdfObjectVector()
+    for object_text in object_texts:
+        idf_objects.append(openstudio.IdfObject.load(object_text).get())
+    return model.addObjects(idf_objects)
+
+
+class TranslationCache:
+    """Translation results on disk keyed on the model content, building name, translator, tasty and ontology versions.
+
+    An entry holds the Haystack and Brick graphs as turtle and the point manifest of the
+    translation, see points.apply_point_manifest.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+
+    def key(self, model, building_name: str) -> str:
+        key = hashlib.sha256()
+        key.update(model_content_hash(model).encode('utf-8'))
+        key.update(building_name.encode('utf-8'))
+        key.update(openstudio_metadata_utility.__version__.encode('utf-8'))
+        key.update(str(CACHE_FORMAT).encode('utf-8'))
+        # tasty supplies the ontologies and definitions the graphs are built from
+        key.update(str(tasty_version()).encode('utf-8'))
+        for schema_version in GRAPH_FILES:
+            key.update('/'.join(schema_version).encode('utf-8'))
+        return key.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key: str):
+        entry_path = self.entry_path(key)
+        if not os.path.isfile(os.path.join(entry_path, POINTS_FILE)):
+            return None
+        graphs = {}
+        for (schema, version), file_name in GRAPH_FILES.items():
+            graph = tg.get_versioned_graph(schema, version)
+            graph.parse(os.path.join(entry_path, file_name), format='turtle')
+            graphs[(schema, version)] = graph
+        with open(os.path.join(entry_path, POINTS_FILE)) as points_file:
+            manifest = json.load(points_file)
+        return graphs, manifest
+
+    def store(self, key: str, graphs, manifest):
+        entry_path = self.entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        os.makedirs(temp_path, exist_ok=True)
+        for schema_version, file_name in GRAPH_FILES.items():
+            graphs[schema_version].serialize(destination=os.path.join(temp_path, file_name), format='turtle')
+        # the points file is written last, an entry is only complete once it exists
+        with open(os.path.join(temp_path, POINTS_FILE), 'w') as points_file:
+            json.dump(manifest, points_file)
+        try:
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # another process stored the same entry first
+            shutil.rmtree(temp_path)
@@ -0,0 +1,172 @@
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import traceback
+
+import openstudio
+import tasty.constants as tc
+import tasty.graphs as tg
+
+from openstudio_metadata_utility.batch import building_name_from_path, find_models, format_summary
+
+
+class CampusWriter:
+    """Shared Brick, Haystack and point manifest sinks that buildings are appended to one at a time.
+
+    Sinks are paths or text file objects, any of them may be None. Brick is written as turtle or
+    ntriples, each building's turtle block declares its own prefixes. The Haystack documents
+    (from tg.graph_to_hayson_string) and the point manifests are each written as one JSON object
+    keyed on building name.
+    """
+
+    def __init__(self, brick_sink=None, haystack_sink=None, points_sink=None, format='turtle'):
+        self.format = format
+        self._opened = []
+        self.brick_sink = self._open(brick_sink)
+        self.haystack_sink = self._open(haystack_sink)
+        self.points_sink = self._open(points_sink)
+        self.buildings = 0
+        for sink in (self.haystack_sink, self.points_sink):
+            if sink is not None:
+                sink.write("{")
+
+    def _open(self, sink):
+        if isinstance(sink, (str, os.PathLike)):
+            sink = open(sink, 'w', encoding='utf-8')
+            self._opened.append(sink)
+        return sink
+
+    def write_building(self, translator):
+        """Append the last translation of translator to the sinks.
+
+        All outputs of the building are rendered before any sink is written, so a serialization
+        error leaves no partial entry behind.
+        """
+        brick = haystack = points = None
+        if self.brick_sink is not None:
+            brick = io.StringIO()
+            translator.write_brick(brick, self.format)
+            if self.format in ('turtle', 'ttl'):
+                brick.write("\n")
+        if self.haystack_sink is not None:
+            with translator.profile_stage('serialization'):
+                haystack = tg.graph_to_hayson_string(translator.graphs[(tc.HAYSTACK, tc.V3_9_10)])
+        if self.points_sink is not None:
+            points = json.dumps(translator.manifest)
+
+        if brick is not None:
+            self.brick_sink.write(brick.getvalue())
+        if haystack is not None:
+            self._write_entry(self.haystack_sink, translator.building_name, haystack)
+        if points is not None:
+            self._write_entry(self.points_sink, translator.building_name, points)
+        self.buildings += 1
+
+    def _write_entry(self, sink, building_name, document):
+        sink.write(",\n" if self.buildings else "\n")
+        sink.write(f"{json.dumps(building_name)}: {document}")
+
+    def close(self):
+        for sink in (self.haystack_sink, self.points_sink):
+            if sink is not None:
+                sink.write("\n}\n")
+        for sink in self._opened:
+            sink.close()
+        self._opened = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_model(path):
+    return openstudio.model.Model.load(openstudio.path(str(path))).get()
+
+
+def unique_building_name(building_name, taken):
+    name = building_name
+    suffix = 2
+    while name in taken:
+        name = f"{building_name}_{suffix}"
+        suffix += 1
+    taken.add(name)
+    return name
+
+
+def translate_campus(buildings, writer, translator=None):
+    """Translate buildings one at a time into the sinks of writer, each in its own namespace.
+
+    buildings holds .osm paths or (building_name, model) pairs. A path is only loaded when its
+    building is translated and the model, graphs and MetaNodes of a building are released
+    once it is written, so peak memory follows the largest building rather than the campus.
+    Models are not modified, the points are only written to the manifests. A building name that
+    is already taken gets a numbered suffix (name_2), so namespaces and JSON keys stay unique.
+    Returns a result per building, a building that fails to translate or write is recorded and skipped.
+    """
+    if translator is None:
+        from openstudio_metadata_utility.translator import Translator
+        translator = Translator()
+    results = []
+    taken = set()
+    for building in buildings:
+        start = time.perf_counter()
+        if isinstance(building, (str, os.PathLike)):
+            path, building_name, model = str(building), building_name_from_path(building), None
+        else:
+            path, (building_name, model) = None, building
+        building_name = unique_building_name(building_name, taken)
+        result = {'path': path, 'building': building_name}
+        try:
+            if model is None:
+                model = load_model(path)
+            translator.translate(model, building_name, apply_points=False)
+            writer.write_building(translator)
+        except Exception:
+            result['status'] = 'error'
+            result['error'] = traceback.format_exc()
+        else:
+            result['status'] = 'ok'
+            result['meta_nodes'] = len(translator.nodes)
+            result['points'] = len(translator.manifest)
+        model = None
+        translator.release()
+        gc.collect()
+        result['seconds'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate the OpenStudio models of a campus into shared Brick and Haystack files.")
+    parser.add_argument('inputs', nargs='+', help=".osm files or directories containing them, each is one building")
+    parser.add_argument('--brick', default=None, help="file the Brick triples of all buildings are written to")
+    parser.add_argument('--haystack', default=None, help="file the Hayson documents of all buildings are written to")
+    parser.add_argument('--points', default=None, help="file the point manifests of all buildings are written to")
+    parser.add_argument('--format', default='turtle', choices=('turtle', 'ntriples'), help="format of the Brick file")
+    parser.add_argument('--definitions-snapshot', default=None, help="pickle file caching the parsed ontologies and bound definitions between runs")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            paths.extend(find_models(path))
+        else:
+            paths.append(path)
+
+    from openstudio_metadata_utility.translator import Translator
+
+    start = time.perf_counter()
+    with CampusWriter(args.brick, args.haystack, args.points, args.format) as writer:
+        results = translate_campus(paths, writer, Translator(args.definitions_snapshot))
+    print(format_summary(results, time.perf_counter() - start))
+    return 0 if all(result['status'] == 'ok' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
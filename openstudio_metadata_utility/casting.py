@@ -0,0 +1,36 @@
+import inspect
+
+import openstudio
+
+
+def get_object_type(object) -> openstudio.IddObjectType:
+    if type(object) == openstudio.openstudioutilitiesidf.WorkspaceObject:
+        return object.iddObject().type()
+    if hasattr(object, 'iddObjectType'):
+        return object.iddObjectType()
+
+# cast function name -> function across the openstudio submodules, built on first use
+_cast_functions = None
+# IddObjectType value -> resolved cast function
+_cast_table = {}
+
+def get_cast_function(object_type: openstudio.IddObjectType):
+    global _cast_functions
+    cast_func = _cast_table.get(object_type.value())
+    if cast_func is not None:
+        return cast_func
+    if _cast_functions is None:
+        _cast_functions = {}
+        for _, module in inspect.getmembers(openstudio, inspect.ismodule):
+            for func_name in dir(module):
+                if func_name.startswith('to'):
+                    _cast_functions.setdefault(func_name, getattr(module, func_name))
+    cast_func_name = 'to'+object_type.valueDescription().replace('OS','').replace(':','').replace('_','')
+    if cast_func_name not in _cast_functions:
+        raise TypeError(f"No openstudio cast function {cast_func_name} for {object_type.valueDescription()}")
+    cast_func = _cast_functions[cast_func_name]
+    _cast_table[object_type.value()] = cast_func
+    return cast_func
+
+def cast_openstudio_object(model_object):
+    return get_cast_function(get_object_type(model_object))(model_object).get()
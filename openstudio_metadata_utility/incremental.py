@@ -0,0 +1,94 @@
+import hashlib
+
+from rdflib import URIRef
+
+
+def context_fingerprint(*contexts) -> str:
+    """Hash of the IDF text of every object in the contexts and of the objects they point to.
+
+    Targets are included so that changes to objects outside the connection graph, such as the
+    coils of a unitary system, the zone equipment or the curves of a coil, change the fingerprint.
+    """
+    digest = hashlib.sha256()
+    nodes = set()
+    for context in contexts:
+        nodes.update(context.nodes)
+    context = contexts[0]
+    for node in sorted(nodes):
+        model_object = context.get_model_object(node)
+        digest.update(str(model_object).encode('utf-8'))
+        for target in sorted((str(target) for target in model_object.targets())):
+            digest.update(target.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TranslationScope:
+    """The MetaNodes created while translating one air loop or plant loop."""
+
+    def __init__(self, key, fingerprint):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.nodes = []
+        # keys of the plant scopes this scope resolved
+        self.dependencies = set()
+
+
+class TranslationState:
+    """Everything an incremental translation needs from the previous run."""
+
+    def __init__(self, building_name, namespace, graphs):
+        self.building_name = building_name
+        self.namespace = namespace
+        self.graphs = graphs
+        self.nodes = None
+        self.site = None
+        # whether the scopes carry fingerprints, see Translator(incremental=True)
+        self.track_changes = False
+        # ('airloop' | 'plant', handle) -> TranslationScope
+        self.scopes = {}
+        # PointSpec.key -> PointSpec, in registration order
+        self.points = {}
+        # PointSpec.point_id -> PointSpec.key
+        self.point_ids = {}
+
+    def add_point(self, point):
+        """The registered point with the key of point, registering point if there is none.
+
+        Objects with the same name generate the same point name, a new point whose id is taken
+        gets a numbered suffix so subjects and the OutputVariable and EMS names stay unique.
+        """
+        existing = self.points.get(point.key)
+        if existing is not None:
+            return existing
+        name = point.name
+        suffix = 1
+        while point.point_id in self.point_ids:
+            suffix += 1
+            point.set_name(f"{name}_{suffix}")
+        self.points[point.key] = point
+        self.point_ids[point.point_id] = point.key
+        return point
+
+    def remove_point(self, key):
+        point = self.points.pop(key)
+        del self.point_ids[point.point_id]
+
+
+def remove_subjects(graphs, subjects):
+    for graph in graphs.values():
+        for subject in subjects:
+            graph.remove((subject, None, None))
+
+
+def remove_dangling(graphs, namespace, live_subjects):
+    # drop triples about, or pointing at, building entities that no longer exist
+    namespace = str(namespace)
+    for graph in graphs.values():
+        stale = []
+        for triple in graph:
+            for term in (triple[0], triple[2]):
+                if isinstance(term, URIRef) and term.startswith(namespace) and term not in live_subjects:
+                    stale.append(triple)
+                    break
+        for triple in stale:
+            graph.remove(triple)
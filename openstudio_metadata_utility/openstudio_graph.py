@@ -1,105 +1,142 @@
-from networkx.algorithms.traversal.edgebfs import FORWARD
 import openstudio
 import networkx as nx
 from openstudio.openstudioutilitiescore import number
-from openstudio_metadata_utility.utilities import get_object_type, cast_openstudio_object
+from openstudio_metadata_utility.casting import get_object_type, cast_openstudio_object
+from array import array
+from collections import deque
 from enum import Enum
 
-class OpenStudioGraph(nx.DiGraph):
+class Direction(Enum):
+    FORWARD = 1
+    BACK = 2
 
-    def __init__(self, model=None):
-        super().__init__()
-        if model is None:
-            return
-        connections = model.getObjectsByType(openstudio.IddObjectType("OS:Connection"))
-        for connection in connections:
-            source = connection.getField(2)
-            target = connection.getField(4)
-            if source.is_initialized() and target.is_initialized():
-                sourceObject = openstudio.model.getModelObject(model, openstudio.toUUID(source.get())).get()
-                targetObject = openstudio.model.getModelObject(model, openstudio.toUUID(target.get())).get()
-                self.add_node(sourceObject.name().get(), object=sourceObject)
-                self.add_node(targetObject.name().get(), object=targetObject)
-                self.add_edge(sourceObject.name().get(), targetObject.name().get())
+def to_node(node):
+    if type(node) != str:
+        node = str(node.handle())
+    return node
 
-        zones = model.getObjectsByType(openstudio.IddObjectType("OS:ThermalZone"))
-        for zone in zones:
-            inlet_port = sourceObject = openstudio.model.getModelObject(model, openstudio.toUUID(zone.getField(9).get())).get()
-            exhaust_port = sourceObject = openstudio.model.getModelObject(model, openstudio.toUUID(zone.getField(10).get())).get()
-            return_port = sourceObject = openstudio.model.getModelObject(model, openstudio.toUUID(zone.getField(12).get())).get()
-            self.add_node(inlet_port.name().get(), object=inlet_port)
-            self.add_node(exhaust_port.name().get(), object=exhaust_port)
-            self.add_node(return_port.name().get(), object=return_port)
-            self.add_node(zone.name().get(), object=zone)
-            self.add_edge(inlet_port.name().get(), zone.name().get())
-            self.add_edge(zone.name().get(), exhaust_port.name().get())
-            self.add_edge(zone.name().get(), return_port.name().get())
+def to_type_value(idd_object_type) -> int:
+    if type(idd_object_type) == str:
+        idd_object_type = openstudio.IddObjectType(idd_object_type)
+    return idd_object_type.value()
 
-        self.extras = {}
+# IddObjectType value -> IddObjectType, so node records only need to keep the integer
+_idd_object_types = {}
 
-    def subgraph(self, nodes):
-        new_graph = super().subgraph(nodes)
-        new_graph.extras = self.extras.copy()
-        return new_graph
+def idd_object_type(type_value) -> openstudio.IddObjectType:
+    object_type = _idd_object_types.get(type_value)
+    if object_type is None:
+        object_type = _idd_object_types[type_value] = openstudio.IddObjectType(type_value)
+    return object_type
+
+class NodeRecord:
+    """What the graph keeps per node, the model object is only loaded when it is asked for."""
+    __slots__ = ('handle', 'type_value', 'name', 'order', '_object')
+
+    def __init__(self, handle, type_value, name, order, model_object=None):
+        self.handle = handle
+        self.type_value = type_value
+        self.name = name
+        # position the node was added in, keeps subgraph indexes in graph order
+        self.order = order
+        self._object = model_object
+
+def traverse(graph, source, direction=Direction.FORWARD, stop_at_types=None, stop_at_nodes=None, depth_limit=None):
+    """Breadth first walk from source yielding each reachable node once, source first.
+
+    Nodes whose type is in stop_at_types or which are in stop_at_nodes are neither yielded
+    nor expanded. The source itself is always yielded. When depth_limit is given only nodes
+    at most that many edges away from the source are visited.
+    """
+    source = to_node(source)
+    if direction == Direction.FORWARD:
+        next_nodes = graph.successors
+    else:
+        next_nodes = graph.predecessors
+    stop_types = set()
+    if stop_at_types is not None:
+        stop_types = {to_type_value(stop_type) for stop_type in stop_at_types}
+    stop_nodes = set()
+    if stop_at_nodes is not None:
+        if type(stop_at_nodes) == str:
+            stop_at_nodes = [stop_at_nodes]
+        stop_nodes = {to_node(stop_node) for stop_node in stop_at_nodes}
+
+    visited = {source}
+    queue = deque([(source, 0)])
+    while queue:
+        node, depth = queue.popleft()
+        yield node
+        if depth_limit is not None and depth >= depth_limit:
+            continue
+        for next_node in next_nodes(node):
+            if next_node in visited or next_node in stop_nodes:
+                continue
+            if stop_types and graph.get_type_value(next_node) in stop_types:
+                continue
+            visited.add(next_node)
+            queue.append((next_node, depth + 1))
 
-    def get_downstream_subgraph(self, node, stop_at_types=None, stop_at_nodes=None) -> 'OpenStudioGraph':
-        if type(node) != str:
-            node = node.name().get()
-        nodes = [node]
-        while True:
-            additions = False
-            for node in nodes:
-                for node in self.neighbors(node):
-                    if stop_at_types != None:
-                        if self.get_type(node) in stop_at_types:
-                            continue
-                    if stop_at_nodes != None:
-                        if node in stop_at_nodes:
-                            continue
-                    if not node in nodes:
-                        nodes.append(node)
-                        additions = True
-            if not additions:
-                return self.subgraph(nodes)
-
-    def get_upstream_subgraph(self, node, stop_at_types=None, stop_at_nodes=None) -> 'OpenStudioGraph':
-        if type(node) != str:
-            node = node.name().get()
-        nodes = [node]
-        while True:
-            additions = False
-            for node in nodes:
-                for node in self.predecessors(node):
-                    if stop_at_types != None:
-                        if self.get_type( node) in stop_at_types:
-                            continue
-                    if stop_at_nodes != None:
-                        if node in stop_at_nodes:
-                            continue
-                    if not node in nodes:
-                        nodes.append(node)
-                        additions = True
-            if not additions:
-                return self.subgraph(nodes)
+def read_osm_objects(path):
+    """Stream the objects of an .osm file as (object type, fields) tuples, fields[0] being the handle."""
+    object_type = None
+    fields = []
+    with open(path, encoding='utf-8') as osm:
+        for line in osm:
+            content = line.split('!-', 1)[0].strip()
+            if not content:
+                continue
+            end = content[-1] == ';'
+            if content[-1] in ',;':
+                content = content[:-1]
+            values = [value.strip() for value in content.split(',')]
+            if object_type is None:
+                object_type = values[0]
+                values = values[1:]
+            fields.extend(values)
+            if end:
+                yield object_type, fields
+                object_type = None
+                fields = []
+
+class ModelSource:
+    """Where the SWIG objects of a graph come from, the model is only loaded from path once it is needed."""
+
+    def __init__(self, model=None, path=None):
+        self.model = model
+        self.path = path
+
+    def get_model(self):
+        if self.model is None:
+            if self.path is None:
+                raise ValueError("Graph is not attached to an openstudio model")
+            self.model = openstudio.model.Model.load(openstudio.path(str(self.path))).get()
+        return self.model
+
+    def get_object(self, handle):
+        return openstudio.model.getModelObject(self.get_model(), openstudio.toUUID(handle)).get()
+
+class GraphQueries:
+    """The queries the translator runs against the full graph and its contexts.
+
+    Implementations provide _records, _type_index, _model_source, extras, successors,
+    predecessors and context(nodes), which builds the context holding nodes.
+    """
+
+    def get_downstream_subgraph(self, node, stop_at_types=None, stop_at_nodes=None, depth_limit=None):
+        return self.context(list(traverse(self, node, Direction.FORWARD, stop_at_types, stop_at_nodes, depth_limit)))
+
+    def get_upstream_subgraph(self, node, stop_at_types=None, stop_at_nodes=None, depth_limit=None):
+        return self.context(list(traverse(self, node, Direction.BACK, stop_at_types, stop_at_nodes, depth_limit)))
 
     def get_next_relative_of_type(self, node, target_type: openstudio.IddObjectType, direction: 'Direction'):
-        if type(node) != str:
-            node = node.name().get()
-        nodes = [node]
-        next_nodes_method = self.predecessors
-        if direction == FORWARD:
-            next_nodes_method = self.neighbors
-        while True:
-            additions = False
-            for node in nodes:
-                for node in next_nodes_method(node):
-                    if self.get_type(node) == target_type:
-                        return node
-                    if not node in nodes:
-                        nodes.append(node)
-                        additions = True
-            if not additions:
-                return
+        target_value = to_type_value(target_type)
+        relatives = traverse(self, node, direction)
+        # the first node yielded is the starting node itself
+        next(relatives)
+        for relative in relatives:
+            if self.get_type_value(relative) == target_value:
+                return relative
 
     def get_nth_child_of_type(self, node, target_type: openstudio.IddObjectType, n: number):
         current_node = node
@@ -117,24 +154,30 @@ class OpenStudioGraph(nx.DiGraph):
                 return
         return current_node
 
+    def get_type(self, node) -> openstudio.IddObjectType:
+        return idd_object_type(self._records[node].type_value)
 
+    def get_type_value(self, node) -> int:
+        return self._records[node].type_value
 
-    def get_type(self, node) -> openstudio.IddObjectType:
-        object = nx.get_node_attributes(self, "object")[node]
-        return get_object_type(object)
+    def get_name(self, node) -> str:
+        return self._records[node].name
 
     def get_nodes_by_type(self, idd_object_type):
-        if type(idd_object_type) == str:
-            idd_object_type = openstudio.IddObjectType(idd_object_type)
-        nodes = []
-        for node in self.nodes:
-            if self.get_type(node) == idd_object_type:
-                nodes.append(node)
-        return nodes
+        return list(self._type_index.get(to_type_value(idd_object_type), ()))
+
+    def get_type_buckets(self):
+        # (IddObjectType value, nodes) for every type in the graph, nodes in graph order
+        return self._type_index.items()
+
+    def get_model_object(self, node):
+        record = self._records[node]
+        if record._object is None:
+            record._object = self._model_source.get_object(node)
+        return record._object
 
     def get_object_from_node(self, node):
-        model_object = nx.get_node_attributes(self, "object")[node]
-        return cast_openstudio_object(model_object)
+        return cast_openstudio_object(self.get_model_object(node))
 
     def set_extra(self, key, value):
         self.extras[key] = value
@@ -144,8 +187,193 @@ class OpenStudioGraph(nx.DiGraph):
             return self.extras[key]
         return None
 
-    class Direction(Enum):
-        FORWARD = 1
-        BACK = 2
+    Direction = Direction
+
+class OpenStudioGraph(GraphQueries, nx.DiGraph):
+    # contexts are subgraph views unless set, then they are materialized as CompactContexts
+    compact_contexts = False
+
+    def __init__(self, model=None):
+        super().__init__()
+        self.extras = {}
+        # IddObjectType value -> {node: None}, an insertion ordered set of the nodes of that type
+        self._type_index = {}
+        # nodes are keyed by model object handle, node -> NodeRecord
+        self._records = {}
+        self._model_source = ModelSource(model)
+        if model is None:
+            return
+        # one pass over the model instead of a getModelObject lookup per connection endpoint
+        model_objects = {}
+        for model_object in model.modelObjects():
+            model_objects[str(model_object.handle())] = model_object
+
+        connections = model.getObjectsByType(openstudio.IddObjectType("OS:Connection"))
+        for connection in connections:
+            source = connection.getField(2)
+            target = connection.getField(4)
+            if source.is_initialized() and target.is_initialized():
+                source = source.get()
+                target = target.get()
+                self.add_model_object(source, model_objects[source])
+                self.add_model_object(target, model_objects[target])
+                self.add_edge(source, target)
+
+        zones = model.getObjectsByType(openstudio.IddObjectType("OS:ThermalZone"))
+        for zone in zones:
+            zone_handle = str(zone.handle())
+            inlet_port = zone.getField(9).get()
+            exhaust_port = zone.getField(10).get()
+            return_port = zone.getField(12).get()
+            self.add_model_object(inlet_port, model_objects[inlet_port])
+            self.add_model_object(exhaust_port, model_objects[exhaust_port])
+            self.add_model_object(return_port, model_objects[return_port])
+            self.add_model_object(zone_handle, model_objects[zone_handle])
+            self.add_edge(inlet_port, zone_handle)
+            self.add_edge(zone_handle, exhaust_port)
+            self.add_edge(zone_handle, return_port)
+
+    @classmethod
+    def from_osm(cls, path) -> 'OpenStudioGraph':
+        # Builds the topology straight from the .osm text, model objects are only loaded when requested
+        graph = cls()
+        graph._model_source.path = path
+        idd_object_types = {}
+        objects = {}
+        connections = []
+        zones = []
+        for object_type, fields in read_osm_objects(path):
+            if object_type == 'OS:Connection':
+                if len(fields) > 4 and fields[2] and fields[4]:
+                    connections.append((fields[2], fields[4]))
+                continue
+            if object_type not in idd_object_types:
+                idd_object_types[object_type] = openstudio.IddObjectType(object_type)
+            name = fields[1] if len(fields) > 1 and fields[1] else fields[0]
+            objects[fields[0]] = (idd_object_types[object_type], name)
+            if object_type == 'OS:ThermalZone':
+                zones.append((fields[0], fields[9], fields[10], fields[12]))
+
+        for source, target in connections:
+            graph.add_object_node(source, *objects[source])
+            graph.add_object_node(target, *objects[target])
+            graph.add_edge(source, target)
+
+        for zone, inlet_port, exhaust_port, return_port in zones:
+            for node in (inlet_port, exhaust_port, return_port, zone):
+                graph.add_object_node(node, *objects[node])
+            graph.add_edge(inlet_port, zone)
+            graph.add_edge(zone, exhaust_port)
+            graph.add_edge(zone, return_port)
+        return graph
+
+    def attach_model(self, model):
+        self._model_source.model = model
+
+    def add_model_object(self, node, model_object):
+        if node in self._records:
+            return
+        # the proxy is not kept, get_model_object looks it up again from the model when needed
+        name = model_object.name()
+        self.add_object_node(node, get_object_type(model_object), name.get() if name.is_initialized() else node)
+
+    def add_object_node(self, node, idd_object_type, name, model_object=None):
+        if node in self._records:
+            return
+        type_value = idd_object_type.value()
+        _idd_object_types.setdefault(type_value, idd_object_type)
+        self.add_node(node)
+        self._records[node] = NodeRecord(node, type_value, name, len(self._records), model_object)
+        self._type_index.setdefault(type_value, {})[node] = None
+
+    def subgraph(self, nodes):
+        new_graph = super().subgraph(nodes)
+        new_graph.extras = self.extras.copy()
+        # node records never change so they are shared, the index is filtered to the subgraph
+        records = self._records
+        new_graph._records = records
+        new_graph._model_source = self._model_source
+        # one pass over the subgraph nodes rather than over the whole index of the parent
+        new_graph._type_index = {}
+        for node in sorted(new_graph, key=lambda node: records[node].order):
+            new_graph._type_index.setdefault(records[node].type_value, {})[node] = None
+        return new_graph
+
+    def context(self, nodes):
+        if self.compact_contexts:
+            return CompactContext(self, nodes)
+        return self.subgraph(nodes)
+
     #def get_reheat_terminals(self):
-    #    types = {'OS:AirTerminal:SingleDuct:ConstantVolume:Reheat'}
\ No newline at end of file
+    #    types = {'OS:AirTerminal:SingleDuct:ConstantVolume:Reheat'}
+
+
+class CompactContext(GraphQueries):
+    """A frozen copy of part of a graph with CSR adjacency arrays, its own type index and extras.
+
+    Queries cost flat list and array lookups instead of going through the filters of nested
+    subgraph views. Node records and the model source are shared with the graph it came from.
+    """
+
+    def __init__(self, graph, nodes):
+        records = graph._records
+        self._records = records
+        self._model_source = graph._model_source
+        self.extras = graph.extras.copy()
+        self._nodes = sorted(set(nodes), key=lambda node: records[node].order)
+        self._index = {node: i for i, node in enumerate(self._nodes)}
+        self._type_index = {}
+        for node in self._nodes:
+            self._type_index.setdefault(records[node].type_value, []).append(node)
+        self._succ_offsets, self._succ_targets = self._adjacency(graph.successors)
+        self._pred_offsets, self._pred_targets = self._adjacency(graph.predecessors)
+
+    def _adjacency(self, neighbors):
+        offsets = array('l', [0])
+        targets = array('l')
+        index = self._index
+        for node in self._nodes:
+            targets.extend(index[neighbor] for neighbor in neighbors(node) if neighbor in index)
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def context(self, nodes):
+        return CompactContext(self, nodes)
+
+    def successors(self, node):
+        i = self._index[node]
+        return [self._nodes[j] for j in self._succ_targets[self._succ_offsets[i]:self._succ_offsets[i + 1]]]
+
+    def predecessors(self, node):
+        i = self._index[node]
+        return [self._nodes[j] for j in self._pred_targets[self._pred_offsets[i]:self._pred_offsets[i + 1]]]
+
+    @property
+    def nodes(self):
+        return tuple(self._nodes)
+
+    @property
+    def edges(self):
+        return [(self._nodes[i], self._nodes[j]) for i in range(len(self._nodes)) for j in self._succ_targets[self._succ_offsets[i]:self._succ_offsets[i + 1]]]
+
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    def has_node(self, node):
+        return node in self._index
+
+    def __contains__(self, node):
+        return node in self._index
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def to_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        for node in self._nodes:
+            graph.add_node(node, label=self.get_name(node))
+        graph.add_edges_from(self.edges)
+        return graph
@@ -0,0 +1,154 @@
+import abc
+
+import openstudio
+
+from openstudio_metadata_utility.cache import add_idf_objects
+from openstudio_metadata_utility.utilities import name_to_id
+
+
+class PointSpec(abc.ABC):
+    """A sensor or actuator the translation asked for, its model objects are created later by emit."""
+
+    def __init__(self):
+        # model objects created for this point
+        self.objects = []
+        # keys of the translation scopes that use this point
+        self.scopes = set()
+
+    def set_name(self, name):
+        # the name is data, points are identified by key, see TranslationState.add_point
+        self.name = name
+        self.point_id = name_to_id(name)
+
+    @abc.abstractmethod
+    def emit(self, model):
+        pass
+
+    @abc.abstractmethod
+    def to_manifest(self) -> dict:
+        pass
+
+    def remove(self, model):
+        for model_object in self.objects:
+            existing = model.getObject(model_object.handle())
+            if existing.is_initialized():
+                existing.get().remove()
+        self.objects = []
+
+    def ensure(self, model):
+        # re-adds the objects of an already emitted point to a model that lacks them
+        if all(model.getObject(model_object.handle()).is_initialized() for model_object in self.objects):
+            return
+        object_texts = [str(model_object) for model_object in self.objects]
+        self.remove(model)
+        self.objects = list(add_idf_objects(model, object_texts))
+
+
+class SensorSpec(PointSpec):
+    kind = 'sensor'
+
+    def __init__(self, key_handle, key_value, variable, frequency='timestep'):
+        super().__init__()
+        self.key_handle = key_handle
+        self.key_value = key_value
+        self.variable = variable
+        self.frequency = frequency
+        self.set_name(key_value + '_' + variable.replace(' ', '_'))
+
+    @property
+    def key(self):
+        return (self.kind, self.key_handle, self.variable)
+
+    def emit(self, model):
+        output_variable = openstudio.openstudiomodel.OutputVariable(self.variable, model)
+        output_variable.setKeyValue(self.key_value)
+        output_variable.setReportingFrequency(self.frequency)
+        output_variable.setName(self.name)
+
+        sensor = openstudio.openstudiomodel.EnergyManagementSystemSensor(model, output_variable)
+        sensor.setKeyName(self.key_handle)
+        sensor.setName(f"EMS_{self.name}")
+        self.objects = [output_variable, sensor]
+        return self.objects
+
+    def to_manifest(self) -> dict:
+        return {
+            'kind': self.kind,
+            'point_id': self.point_id,
+            'ems_name': f"EMS_{self.name}",
+            'output_variable_name': self.name,
+            'key_handle': self.key_handle,
+            'key_value': self.key_value,
+            'variable': self.variable,
+            'frequency': self.frequency,
+        }
+
+    @classmethod
+    def from_manifest(cls, entry):
+        point = cls(entry['key_handle'], entry['key_value'], entry['variable'], entry['frequency'])
+        point.set_name(entry['output_variable_name'])
+        return point
+
+
+class ActuatorSpec(PointSpec):
+    kind = 'actuator'
+
+    def __init__(self, component_handle, component_name, component_type, control_type):
+        super().__init__()
+        self.component_handle = component_handle
+        self.component_name = component_name
+        self.component_type = component_type
+        self.control_type = control_type
+        self.set_name(name_to_id(component_name + ' ' + control_type))
+
+    @property
+    def key(self):
+        return (self.kind, self.component_handle, self.component_type, self.control_type)
+
+    def emit(self, model):
+        component = openstudio.model.getModelObject(model, openstudio.toUUID(self.component_handle)).get()
+        actuator = openstudio.openstudiomodel.EnergyManagementSystemActuator(component, self.component_type, self.control_type)
+        actuator.setName(self.name)
+        self.objects = [actuator]
+        return self.objects
+
+    def to_manifest(self) -> dict:
+        return {
+            'kind': self.kind,
+            'point_id': self.point_id,
+            'ems_name': self.name,
+            'component_handle': self.component_handle,
+            'component_name': self.component_name,
+            'component_type': self.component_type,
+            'control_type': self.control_type,
+        }
+
+    @classmethod
+    def from_manifest(cls, entry):
+        point = cls(entry['component_handle'], entry['component_name'], entry['component_type'], entry['control_type'])
+        point.set_name(entry['ems_name'])
+        return point
+
+
+POINT_KINDS = {
+    SensorSpec.kind: SensorSpec,
+    ActuatorSpec.kind: ActuatorSpec,
+}
+
+
+def point_manifest(points) -> list:
+    return [point.to_manifest() for point in points]
+
+
+def apply_point_manifest(model, manifest) -> list:
+    """Create the OutputVariable and EMS objects listed in a point manifest on model.
+
+    The manifest refers to objects by handle, so model must be the translated model or a copy
+    loaded from the same file. Returns the created model objects.
+    """
+    added_objects = []
+    for entry in manifest:
+        if entry['kind'] not in POINT_KINDS:
+            raise ValueError(f"Unknown point kind {entry['kind']}")
+        added_objects.extend(POINT_KINDS[entry['kind']].from_manifest(entry).emit(model))
+    return added_objects
@@ -0,0 +1,185 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def add(self, seconds, peak_bytes):
+        self.calls += 1
+        self.seconds += seconds
+        self.peak_bytes = max(self.peak_bytes, peak_bytes)
+
+    def to_dict(self):
+        return {'calls': self.calls, 'seconds': self.seconds, 'peak_bytes': self.peak_bytes}
+
+
+class GroupStats(StageStats):
+    def __init__(self):
+        super().__init__()
+        self.stages = {}
+
+
+class _MemoryFrame:
+    def __init__(self, start):
+        self.start = start
+        self.peak = start
+
+
+class Profiler:
+    """Wall time, call counts and tracemalloc peaks per translation stage.
+
+    Stage times are inclusive, a stage nested in another also counts towards the outer one.
+    Stages entered while a group (an air loop or plant loop) is active are also recorded
+    against the innermost group, so the group breakdown adds up to that group's own time.
+    tracemalloc slows down every stage it runs under, with track_memory the times are not
+    representative, take them from a profile without it and merge the peaks with add_memory.
+    """
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+        # kind -> name -> GroupStats
+        self.groups = {}
+        self._frames = []
+        self._group_stack = []
+        self._started_tracing = False
+
+    def _enter_memory(self):
+        if not self.track_memory:
+            return
+        if not self._frames and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            self._frames[-1].peak = max(self._frames[-1].peak, peak)
+        self._frames.append(_MemoryFrame(current))
+        tracemalloc.reset_peak()
+
+    def _exit_memory(self) -> int:
+        if not self.track_memory:
+            return 0
+        _, peak = tracemalloc.get_traced_memory()
+        frame = self._frames.pop()
+        frame.peak = max(frame.peak, peak)
+        if self._frames:
+            self._frames[-1].peak = max(self._frames[-1].peak, frame.peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        return frame.peak - frame.start
+
+    @contextmanager
+    def stage(self, name):
+        self._enter_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = self._exit_memory()
+            self.stages.setdefault(name, StageStats()).add(seconds, peak_bytes)
+            if self._group_stack:
+                self._group_stack[-1].stages.setdefault(name, StageStats()).add(seconds, peak_bytes)
+
+    @contextmanager
+    def group(self, kind, name):
+        group = self.groups.setdefault(kind, {}).setdefault(name, GroupStats())
+        self._group_stack.append(group)
+        self._enter_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = self._exit_memory()
+            self._group_stack.pop()
+            group.add(seconds, peak_bytes)
+
+    def wrap(self, function, stage=None, group=None):
+        # group is (kind, function of the call arguments returning the group name)
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if group is not None:
+                with self.group(group[0], group[1](*args, **kwargs)):
+                    return function(*args, **kwargs)
+            with self.stage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def instrument(self, targets):
+        """Replace the (owner, attribute, stage, group) targets with timed wrappers until exit.
+
+        owner may be a module, class or instance, the original attributes are restored afterwards.
+        """
+        patched = []
+        try:
+            for owner, attribute, stage, group in targets:
+                had_attribute = attribute in vars(owner)
+                original = vars(owner).get(attribute)
+                setattr(owner, attribute, self.wrap(getattr(owner, attribute), stage, group))
+                patched.append((owner, attribute, had_attribute, original))
+            yield self
+        finally:
+            for owner, attribute, had_attribute, original in reversed(patched):
+                if had_attribute:
+                    setattr(owner, attribute, original)
+                else:
+                    delattr(owner, attribute)
+
+    def add_memory(self, other):
+        """Take the memory peaks of other, a profile of a separate pass run with track_memory."""
+        for name, stats in other.stages.items():
+            self.stages.setdefault(name, StageStats()).peak_bytes = stats.peak_bytes
+        for kind, groups in other.groups.items():
+            for name, stats in groups.items():
+                group = self.groups.setdefault(kind, {}).setdefault(name, GroupStats())
+                group.peak_bytes = stats.peak_bytes
+                for stage, stage_stats in stats.stages.items():
+                    group.stages.setdefault(stage, StageStats()).peak_bytes = stage_stats.peak_bytes
+
+    def report(self) -> dict:
+        return {
+            'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+            'groups': {
+                kind: {
+                    name: dict(stats.to_dict(), stages={stage: stage_stats.to_dict() for stage, stage_stats in stats.stages.items()})
+                    for name, stats in groups.items()
+                }
+                for kind, groups in self.groups.items()
+            },
+        }
+
+    def write_json(self, sink):
+        if isinstance(sink, (str, os.PathLike)):
+            with open(sink, 'w') as out:
+                return self.write_json(out)
+        json.dump(self.report(), sink, indent=1)
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<40} {'calls':>8} {'seconds':>10} {'peak MiB':>9}"]
+        for name, stats in self.stages.items():
+            lines.append(format_row(name, stats))
+        for kind, groups in self.groups.items():
+            lines.append('')
+            lines.append(f"{kind:<40} {'calls':>8} {'seconds':>10} {'peak MiB':>9}")
+            for name, stats in sorted(groups.items(), key=lambda item: -item[1].seconds):
+                lines.append(format_row(name, stats))
+                for stage, stage_stats in stats.stages.items():
+                    lines.append(format_row(f"  {stage}", stage_stats))
+        return '\n'.join(lines)
+
+
+def format_row(name, stats):
+    return f"{name[:40]:<40} {stats.calls:>8} {stats.seconds:>10.3f} {stats.peak_bytes / 2**20:>9.1f}"
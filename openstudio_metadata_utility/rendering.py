@@ -0,0 +1,54 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+
+
+def write_context_png(nodes, edges, path):
+    graph = nx.DiGraph()
+    for node, name in nodes:
+        graph.add_node(node, label=name)
+    graph.add_edges_from(edges)
+    nx.nx_pydot.to_pydot(graph).write_png(path)
+
+
+class ContextRenderer:
+    """Writes debug PNGs of graph contexts to output_dir on background threads.
+
+    Only the node names and edges are copied on the calling thread, graphviz runs on the
+    worker threads so translation never waits on it.
+    """
+
+    def __init__(self, output_dir, workers=2):
+        self.output_dir = str(output_dir)
+        self.workers = workers
+        self._pool = None
+        self._pending = []
+
+    def render(self, context, file_name):
+        if self._pool is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='context-render')
+        nodes = [(node, context.get_name(node)) for node in context.nodes]
+        edges = list(context.edges)
+        path = os.path.join(self.output_dir, f"{file_name}.png")
+        self._pending.append((path, self._pool.submit(write_context_png, nodes, edges, path)))
+
+    def wait(self):
+        # blocks until queued renders finish, failures are reported as warnings and returned
+        failures = []
+        for path, future in self._pending:
+            error = future.exception()
+            if error is not None:
+                warnings.warn(f"Could not render {path}: {error}")
+                failures.append((path, error))
+        self._pending = []
+        return failures
+
+    def close(self):
+        failures = self.wait()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return failures
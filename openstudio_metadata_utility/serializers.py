@@ -0,0 +1,118 @@
+import os
+import re
+
+from rdflib import RDF, Literal, URIRef
+
+# flush buffered lines to the sink every this many lines
+CHUNK_LINES = 1000
+
+# conservative prefixed-name local part, anything else is written as a full IRI
+_LOCAL_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_\-]*$')
+_NT_ESCAPES = {ord('\\'): '\\\\', ord('"'): '\\"', ord('\n'): '\\n', ord('\r'): '\\r'}
+
+
+def ordered_subjects(graph, nodes=None):
+    """Subjects of graph in MetaNode registry order, followed by any subjects not owned by a MetaNode."""
+    seen = set()
+    if nodes is not None:
+        for node in nodes:
+            for subject in node.subjects():
+                if subject not in seen:
+                    seen.add(subject)
+                    yield subject
+    remaining = set(graph.subjects()) - seen
+    yield from sorted(remaining)
+
+
+class _ChunkedWriter:
+    def __init__(self, sink):
+        self.sink = sink
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= CHUNK_LINES:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.sink.write(''.join(self.lines))
+            self.lines = []
+
+
+class _QNames:
+    def __init__(self, graph):
+        # longest namespace first so the most specific prefix wins
+        self.namespaces = sorted(((str(namespace), prefix) for prefix, namespace in graph.namespaces()), key=lambda item: -len(item[0]))
+        self.cache = {}
+
+    def prefixes(self):
+        return sorted((prefix, namespace) for namespace, prefix in self.namespaces)
+
+    def term(self, term):
+        if not isinstance(term, URIRef):
+            return term.n3()
+        qname = self.cache.get(term)
+        if qname is None:
+            qname = term.n3()
+            for namespace, prefix in self.namespaces:
+                if term.startswith(namespace) and _LOCAL_NAME.match(term[len(namespace):]):
+                    qname = f"{prefix}:{term[len(namespace):]}"
+                    break
+            self.cache[term] = qname
+        return qname
+
+
+def nt_term(term):
+    # Literal.n3() writes multi-line strings in triple quotes, which N-Triples does not allow
+    if not isinstance(term, Literal):
+        return term.n3()
+    value = f'"{str(term).translate(_NT_ESCAPES)}"'
+    if term.language:
+        return f"{value}@{term.language}"
+    if term.datatype:
+        return f"{value}^^<{term.datatype}>"
+    return value
+
+
+def write_ntriples(graph, sink, nodes=None):
+    writer = _ChunkedWriter(sink)
+    for subject in ordered_subjects(graph, nodes):
+        subject_n3 = subject.n3()
+        for _, predicate, object in graph.triples((subject, None, None)):
+            writer.write(f"{subject_n3} {predicate.n3()} {nt_term(object)} .\n")
+    writer.flush()
+
+
+def write_turtle(graph, sink, nodes=None):
+    writer = _ChunkedWriter(sink)
+    qnames = _QNames(graph)
+    for prefix, namespace in qnames.prefixes():
+        writer.write(f"@prefix {prefix}: <{namespace}> .\n")
+    writer.write("\n")
+    for subject in ordered_subjects(graph, nodes):
+        predicates = {}
+        for _, predicate, object in graph.triples((subject, None, None)):
+            predicates.setdefault(predicate, []).append(object)
+        if not predicates:
+            continue
+        statements = []
+        for predicate, objects in predicates.items():
+            predicate_n3 = 'a' if predicate == RDF.type else qnames.term(predicate)
+            statements.append(f"{predicate_n3} " + ",\n        ".join(qnames.term(object) for object in objects))
+        writer.write(f"{qnames.term(subject)} " + " ;\n    ".join(statements) + " .\n\n")
+    writer.flush()
+
+
+def write_graph(graph, sink, format='turtle', nodes=None):
+    """Stream graph to a text sink (file path or object with write) without building the document in memory."""
+    if isinstance(sink, (str, os.PathLike)):
+        with open(sink, 'w', encoding='utf-8') as out:
+            return write_graph(graph, out, format, nodes)
+    if format in ('nt', 'ntriples'):
+        write_ntriples(graph, sink, nodes)
+    elif format in ('turtle', 'ttl'):
+        write_turtle(graph, sink, nodes)
+    else:
+        raise ValueError(f"Unsupported streaming format {format}")
+
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+import openstudio
+
+from openstudio_metadata_utility.openstudio_graph import OpenStudioGraph, idd_object_type
+
+MAGIC = b'OSMTOPO1'
+_COUNTS = struct.Struct('<III')
+
+
+def model_content_hash(model) -> str:
+    return hashlib.sha256(str(model.toIdfFile()).encode('utf-8')).hexdigest()
+
+
+def file_content_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as model_file:
+        for block in iter(lambda: model_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _int_bytes(values) -> bytes:
+    values = array('i', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _int_array(data, offset, count):
+    values = array('i')
+    values.frombytes(data[offset:offset + count * values.itemsize])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, offset + count * values.itemsize
+
+
+def save_topology(graph, path):
+    """Write the nodes, names, types and edges of graph to path, the model objects are not stored."""
+    records = [graph._records[node] for node in graph._records]
+    index = {record.handle: i for i, record in enumerate(records)}
+    edges = list(graph.edges)
+    strings = '\0'.join([record.handle for record in records] + [record.name for record in records]).encode('utf-8')
+    payload = b''.join([
+        _COUNTS.pack(len(records), len(edges), len(strings)),
+        _int_bytes(record.type_value for record in records),
+        _int_bytes(index[source] for source, _ in edges),
+        _int_bytes(index[target] for _, target in edges),
+        strings,
+    ])
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as out:
+        out.write(MAGIC)
+        out.write(zlib.compress(payload))
+    os.replace(temp_path, path)
+
+
+def load_topology(path, model=None, model_path=None) -> OpenStudioGraph:
+    """Rebuild a graph saved by save_topology.
+
+    The graph answers topology, type and name queries on its own. Model objects come from model,
+    or from loading model_path, the first time one is asked for.
+    """
+    with open(path, 'rb') as topology_file:
+        if topology_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an OpenStudioGraph topology file")
+        compressed = topology_file.read()
+    try:
+        data = zlib.decompress(compressed)
+        node_count, edge_count, strings_size = _COUNTS.unpack_from(data)
+        offset = _COUNTS.size
+        type_values, offset = _int_array(data, offset, node_count)
+        sources, offset = _int_array(data, offset, edge_count)
+        targets, offset = _int_array(data, offset, edge_count)
+        strings = data[offset:offset + strings_size].decode('utf-8').split('\0') if node_count else []
+    except (zlib.error, struct.error, UnicodeDecodeError) as error:
+        raise ValueError(f"{path} is a corrupt topology file: {error}") from error
+    if offset + strings_size != len(data) or len(type_values) != node_count or len(targets) != edge_count or len(strings) != (2 * node_count if node_count else 0):
+        raise ValueError(f"{path} is a corrupt topology file: sizes do not match the header")
+    if any(not 0 <= index < node_count for index in sources) or any(not 0 <= index < node_count for index in targets):
+        raise ValueError(f"{path} is a corrupt topology file: edge refers to a missing node")
+    handles, names = strings[:node_count], strings[node_count:]
+
+    graph = OpenStudioGraph()
+    graph._model_source.model = model
+    graph._model_source.path = model_path
+    for handle, type_value, name in zip(handles, type_values, names):
+        graph.add_object_node(handle, idd_object_type(type_value), name)
+    graph.add_edges_from((handles[source], handles[target]) for source, target in zip(sources, targets))
+    return graph
+
+
+class TopologyCache:
+    """OpenStudioGraph topologies on disk keyed on the model content and the OpenStudio version.
+
+    IddObjectType values are only stable within one OpenStudio version, so the version is part
+    of the key. Keys from key_for_path hash the .osm bytes and keys from key_for_model hash the
+    IDF text of the model, the same building has a different key through each.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+
+    def _key(self, content_hash) -> str:
+        key = hashlib.sha256()
+        key.update(content_hash.encode('utf-8'))
+        key.update(openstudio.openStudioVersion().encode('utf-8'))
+        key.update(MAGIC)
+        return key.hexdigest()
+
+    def key_for_path(self, path) -> str:
+        return self._key(file_content_hash(path))
+
+    def key_for_model(self, model) -> str:
+        return self._key(model_content_hash(model))
+
+    def entry_path(self, key) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.topo")
+
+    def load(self, key, model=None, model_path=None):
+        entry_path = self.entry_path(key)
+        if not os.path.isfile(entry_path):
+            return None
+        try:
+            return load_topology(entry_path, model, model_path)
+        except ValueError:
+            # a truncated or corrupt entry is a miss, store writes it again
+            os.remove(entry_path)
+            return None
+
+    def store(self, key, graph):
+        entry_path = self.entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        save_topology(graph, entry_path)
+
+    def graph_for_path(self, path) -> OpenStudioGraph:
+        # the model is only loaded from path if a model object is requested
+        key = self.key_for_path(path)
+        graph = self.load(key, model_path=path)
+        if graph is None:
+            graph = OpenStudioGraph.from_osm(path)
+            self.store(key, graph)
+        return graph
+
+    def graph_for_model(self, model) -> OpenStudioGraph:
+        key = self.key_for_model(model)
+        graph = self.load(key, model=model)
+        if graph is None:
+            graph = OpenStudioGraph(model)
+            self.store(key, graph)
+        return graph
@@ -4,75 +4,226 @@ import tasty.constants as tc
 import tasty.graphs as tg
 import tasty.entities as te
 
-import networkx as nx
-
-from openstudio_metadata_utility.openstudio_graph import OpenStudioGraph
-from openstudio_metadata_utility.utilities import MetaNode, MetaRef, name_to_id, cast_openstudio_object, PlantType, zone_get_exhaust, zone_get_fcu
+from openstudio_metadata_utility.cache import TranslationCache, tasty_version
+from openstudio_metadata_utility.incremental import TranslationScope, TranslationState, context_fingerprint, remove_dangling, remove_subjects
+from openstudio_metadata_utility.openstudio_graph import GraphQueries, OpenStudioGraph
+from openstudio_metadata_utility.profiling import Profiler
+from openstudio_metadata_utility.points import ActuatorSpec, PointSpec, SensorSpec, apply_point_manifest, point_manifest
+from openstudio_metadata_utility.rendering import ContextRenderer
+from openstudio_metadata_utility.serializers import write_graph
+from openstudio_metadata_utility.utilities import DispatchRules, MetaNode, MetaRef, NamespaceRoutes, NodeRegistry, SyncBatch, name_to_id, cast_openstudio_object, PlantType, zone_get_exhaust, zone_get_fcu
 from openstudio import IddObjectType as idd
+from contextlib import contextmanager, nullcontext
 
 import openstudio
-
-h_ont = tg.load_ontology(tc.HAYSTACK, tc.V3_9_10)
-b_ont = tg.load_ontology(tc.BRICK, tc.V1_2_1)
-
-# Specify the schema version (tc.V9_9_10, etc.) to use
-hp = te.HaystackPointDefs(tc.V3_9_10)
-he = te.HaystackEquipDefs(tc.V3_9_10)
-hrefs = te.HaystackRefDefs(tc.V3_9_10)
-
-bp = te.BrickPointDefs(tc.V1_2_1)
-be = te.BrickEquipmentDefs(tc.V1_2_1)
-bz = te.BrickZoneDefs(tc.V1_2_1)
-bl = te.BrickLocationDefs(tc.V1_2_1)
-bs = te.BrickSystemDefs(tc.V1_2_1)
-brefs = te.BrickRefDefs(tc.V1_2_1, False)
-
-# Bind all of the first class types as attributes
-hp.bind()
-he.bind()
-hrefs.bind()
-
-bp.bind()
-be.bind()
-bz.bind()
-bl.bind()
-bs.bind()
-brefs.bind()
-
-# Simple wrapper around all of the shapes
-shrap = te.ShapesWrapper(tc.HAYSTACK, tc.V3_9_10)
-
-shrap.bind()
-shrap.bind_composite()
-
-equip_ref = MetaRef(hrefs.equipRef, brefs.isPartOf)
-point_ref = MetaRef(hrefs.equipRef, brefs.isPointOf)
-air_ref = MetaRef(hrefs.airRef, brefs.isFedBy)
-space_ref = MetaRef(hrefs.spaceRef, brefs.hasLocation)
-zone_point_ref = MetaRef(hrefs.spaceRef, brefs.isPointOf)
-site_ref = MetaRef(hrefs.siteRef, brefs.hasLocation)
+import openstudio_metadata_utility
+import openstudio_metadata_utility.openstudio_graph as openstudio_graph
+import openstudio_metadata_utility.utilities as utilities
+import os
+import pickle
+import sys
+import warnings
+
+# Ontologies and tasty definitions are loaded on first translate, see load_definitions
+h_ont = b_ont = None
+hp = he = hrefs = None
+bp = be = bz = bl = bs = brefs = None
+shrap = None
+equip_ref = point_ref = air_ref = space_ref = zone_point_ref = site_ref = None
+# namespace routes of the ontologies, each translation adds its own graphs to a copy
+definition_routes = None
+
+SNAPSHOT_ENV_VAR = 'OPENSTUDIO_METADATA_SNAPSHOT'
+SNAPSHOT_VERSIONS = (tc.HAYSTACK, tc.V3_9_10, tc.BRICK, tc.V1_2_1)
+
+def snapshot_versions():
+    # the pickled definitions are only valid for the schema versions and the package and tasty versions that wrote them
+    return SNAPSHOT_VERSIONS + (openstudio_metadata_utility.__version__, tasty_version())
+
+def build_definitions():
+    definitions = {
+        'h_ont': tg.load_ontology(tc.HAYSTACK, tc.V3_9_10),
+        'b_ont': tg.load_ontology(tc.BRICK, tc.V1_2_1),
+        # Specify the schema version (tc.V9_9_10, etc.) to use
+        'hp': te.HaystackPointDefs(tc.V3_9_10),
+        'he': te.HaystackEquipDefs(tc.V3_9_10),
+        'hrefs': te.HaystackRefDefs(tc.V3_9_10),
+        'bp': te.BrickPointDefs(tc.V1_2_1),
+        'be': te.BrickEquipmentDefs(tc.V1_2_1),
+        'bz': te.BrickZoneDefs(tc.V1_2_1),
+        'bl': te.BrickLocationDefs(tc.V1_2_1),
+        'bs': te.BrickSystemDefs(tc.V1_2_1),
+        'brefs': te.BrickRefDefs(tc.V1_2_1, False),
+        # Simple wrapper around all of the shapes
+        'shrap': te.ShapesWrapper(tc.HAYSTACK, tc.V3_9_10),
+    }
+
+    # Bind all of the first class types as attributes
+    for key in ('hp', 'he', 'hrefs', 'bp', 'be', 'bz', 'bl', 'bs', 'brefs', 'shrap'):
+        definitions[key].bind()
+    definitions['shrap'].bind_composite()
+
+    hrefs = definitions['hrefs']
+    brefs = definitions['brefs']
+    definitions.update({
+        'equip_ref': MetaRef(hrefs.equipRef, brefs.isPartOf),
+        'point_ref': MetaRef(hrefs.equipRef, brefs.isPointOf),
+        'air_ref': MetaRef(hrefs.airRef, brefs.isFedBy),
+        'space_ref': MetaRef(hrefs.spaceRef, brefs.hasLocation),
+        'zone_point_ref': MetaRef(hrefs.spaceRef, brefs.isPointOf),
+        'site_ref': MetaRef(hrefs.siteRef, brefs.hasLocation),
+    })
+    return definitions
+
+def load_definitions_snapshot(snapshot_path):
+    try:
+        with open(snapshot_path, 'rb') as snapshot:
+            versions, definitions = pickle.load(snapshot)
+    except Exception:
+        return None
+    if versions != snapshot_versions():
+        return None
+    return definitions
+
+def save_definitions_snapshot(snapshot_path, definitions):
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as snapshot:
+            pickle.dump((snapshot_versions(), definitions), snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+    except Exception as e:
+        warnings.warn(f"Could not write definitions snapshot {snapshot_path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def load_definitions(snapshot_path=None):
+    if h_ont is not None:
+        return
+    if snapshot_path is None:
+        snapshot_path = os.environ.get(SNAPSHOT_ENV_VAR)
+    definitions = None
+    if snapshot_path is not None:
+        definitions = load_definitions_snapshot(snapshot_path)
+    if definitions is None:
+        definitions = build_definitions()
+        if snapshot_path is not None:
+            save_definitions_snapshot(snapshot_path, definitions)
+    globals().update(definitions)
+    globals()['definition_routes'] = NamespaceRoutes((h_ont, b_ont))
 
 class Translator:
-
-    def __init__(self) -> None:
-        self.nodes = []
+    # IddObjectType handlers for the supply side of air loops, plant loops and zone terminals
+    supply_rules = DispatchRules()
+    plant_pump_rules = DispatchRules()
+    plant_equipment_rules = DispatchRules()
+    terminal_rules = DispatchRules()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # rules registered on a subclass must not change the tables of its bases or siblings
+        for name in dir(cls):
+            rules = getattr(cls, name)
+            if isinstance(rules, DispatchRules) and name not in vars(cls):
+                setattr(cls, name, rules.copy())
+
+    def __init__(self, definitions_snapshot=None, cache=None, render_dir=None, profile=False, compact_contexts=False, deferred_sync=True, incremental=False, track_memory=False) -> None:
+        self.nodes = NodeRegistry()
         self.G = None
-
-
-    def translate(self, model, building_name: str):
+        self.definitions_snapshot = definitions_snapshot
+        if cache is not None and not isinstance(cache, TranslationCache):
+            cache = TranslationCache(cache)
+        self.cache = cache
+        self.state = None
+        self.apply_points = True
+        # point manifest of the last translation
+        self.manifest = None
+        self._scope_stack = []
+        # loop fingerprints computed by translate_incremental, reused by enter_scope
+        self._fingerprints = {}
+        # loops are only fingerprinted, and translate_incremental only possible, when incremental is set
+        self.incremental = incremental
+        # debug PNGs of the loop contexts are only written when a directory is given
+        self.renderer = None
+        if render_dir is not None:
+            self.renderer = ContextRenderer(render_dir)
+        # stage timings and call counts are only recorded when profile is set
+        self.profiler = None
+        if profile:
+            self.reset_profiler()
+        # memory peaks of translate() are measured in a separate pass, tracemalloc would inflate the times
+        self.track_memory = track_memory
+        # materialize loop and zone contexts as CompactContexts instead of subgraph views
+        self.compact_contexts = compact_contexts
+        # MetaNodes only mark themselves dirty and are synced once by sync()
+        self.deferred_sync = deferred_sync
+
+    def translate(self, model, building_name: str, apply_points=True):
+        """Translate model into Haystack and Brick graphs.
+
+        With apply_points=False the model is left untouched, the OutputVariable and EMS objects
+        the points need are only described by self.manifest, see points.apply_point_manifest.
+        """
+        if self.profiler is not None and self.track_memory:
+            self.measure_memory('translate', model, building_name, apply_points)
+        with self.profiling('translate'):
+            return self._translate(model, building_name, apply_points)
+
+    def measure_memory(self, stage, model, building_name, apply_points):
+        # translates once with tracemalloc on and keeps only the memory peaks of that pass
+        timing_profiler, cache, renderer = self.profiler, self.cache, self.renderer
+        memory_profiler = Profiler(track_memory=True)
+        self.profiler, self.cache, self.renderer = memory_profiler, None, None
+        try:
+            with self.profiling(stage):
+                self._translate(model, building_name, apply_points)
+        finally:
+            self.profiler, self.cache, self.renderer = timing_profiler, cache, renderer
+        # the timed pass starts from the same model
+        for point in self.state.points.values():
+            point.remove(model)
+        self.profiler.add_memory(memory_profiler)
+
+    def _translate(self, model, building_name, apply_points):
         self.model = model
         self.building_name = building_name
         self.namespace = Namespace(f'{building_name}/')
-        self.nodes = []
-
-        self.G = OpenStudioGraph(model)
+        self.nodes = NodeRegistry(SyncBatch() if self.deferred_sync else None)
+        self.apply_points = apply_points
+        # OutputVariable and EMS objects added to the model by this translation
+        self.added_objects = []
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(model, building_name)
+            cached = self.cache.load(cache_key)
+            if cached is not None:
+                # a cached result has no MetaNodes, so it cannot seed an incremental translation
+                self.state = None
+                self.graphs, self.manifest = cached
+                if apply_points:
+                    self.added_objects = apply_point_manifest(model, self.manifest)
+                return self.graphs
+
+        load_definitions(self.definitions_snapshot)
+
+        with self.profile_stage('graph build'):
+            self.G = OpenStudioGraph(model)
+        self.G.compact_contexts = self.compact_contexts
         hg = tg.get_versioned_graph(tc.HAYSTACK, tc.V3_9_10)
         bg = tg.get_versioned_graph(tc.BRICK, tc.V1_2_1)
 
         self.graphs = {(tc.HAYSTACK, tc.V3_9_10): hg, (tc.BRICK, tc.V1_2_1): bg}
+        self.state = TranslationState(building_name, self.namespace, self.graphs)
+        self.state.nodes = self.nodes
+        self.state.track_changes = self.incremental
+        self._scope_stack = []
+        self._fingerprints = {}
 
         hg.bind(self.building_name, self.namespace)
         bg.bind(self.building_name, self.namespace)
+        self.nodes.routes = definition_routes.copy()
+        self.nodes.routes.add(hg)
+        self.nodes.routes.add(bg)
 
         site_object = cast_openstudio_object(model.getObjectsByType(openstudio.IddObjectType('OS:Building'))[0])
         site = self.create_node(shrap.SiteShape, bl.Building, name=self.building_name)#model_object=site_object)
@@ -80,172 +231,355 @@ class Translator:
         site.bind_to_graph(bg)
 
         self.G.set_extra('site', site)
+        self.state.site = site
 
         for node in self.G.get_nodes_by_type(openstudio.IddObjectType('OS:AirloopHVAC')):
-            loop_object = self.G.get_object_from_node(node)
-
-            outdoor_air_node = loop_object.outdoorAirNode().get()
-            mixed_air_node = loop_object.mixedAirNode().get()
-            supply_outlet_node = loop_object.supplyOutletNode()
-            supply_inlet_node = loop_object.supplyInletNode()
-            relief_air_node = loop_object.reliefAirNode().get()
-            supply_context = self.G.get_downstream_subgraph(supply_inlet_node, stop_at_nodes=[node], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
-            demand_context = self.G.get_downstream_subgraph(loop_object.demandInletNode(), stop_at_nodes=[node])
-
-            unitary_hps = supply_context.get_nodes_by_type(idd('OS:AirLoopHVAC:UnitarySystem'))
-            if len(unitary_hps) > 0:
-                unitary_hp = unitary_hps[0]
-                ahu = self.create_node(he.heatPump, be.AHU, name=unitary_hp)
-                unitary_hp_object = supply_context.get_object_from_node(unitary_hp)
-                heating_coil_object = unitary_hp_object.heatingCoil()
-                cooling_coil_object = unitary_hp_object.coolingCoil()
-                supply_fan_object = unitary_hp_object.supplyFan()
-                supplemental_heating_coil_object = unitary_hp_object.supplementalHeatingCoil()
-
-                if heating_coil_object.is_initialized():
-                    heating_coil_object = heating_coil_object.get()
-                    heating_coil = self.tag_coil(heating_coil_object)
-                    self.add_coil_capacity_points(heating_coil, heating_coil_object)
-                    heating_coil.add_relationship(equip_ref, ahu)
-
-                if supplemental_heating_coil_object.is_initialized():
-                    supplemental_heating_coil_object = supplemental_heating_coil_object.get()
-                    supplemental_heating_coil = self.tag_coil(supplemental_heating_coil_object)
-                    self.add_coil_capacity_points(supplemental_heating_coil, supplemental_heating_coil_object)
-                    supplemental_heating_coil.add_relationship(equip_ref, ahu)
-
-                if cooling_coil_object.is_initialized():
-                    cooling_coil_object = cooling_coil_object.get()
-                    cooling_coil = self.tag_coil(cooling_coil_object)
-                    self.add_coil_capacity_points(cooling_coil, cooling_coil_object)
-                    cooling_coil.add_relationship(equip_ref, ahu)
-
-                if supply_fan_object.is_initialized():
-                    supply_fan = self.tag_discharge_fan(supply_fan_object.get())
-                    supply_fan.add_relationship(equip_ref, ahu)
-            elif "DOAS" in node.upper():
-                ahu = self.create_node(he.doas, be.DOAS, name=node)
-            else:
-                ahu = self.create_node(he.ahu, be.AHU, name=node)
-            ahu.add_relationship(site_ref, site)
-
-            supply_context.set_extra('ahu', ahu)
-            nx.nx_pydot.to_pydot(supply_context).write_png(f"{node}.png")
-            demand_context.set_extra('ahu', ahu)
-            nx.nx_pydot.to_pydot(demand_context).write_png(f"{node}_demand.png")
-
-            self.add_sensor(outdoor_air_node, "System Node Temperature", ahu, self.create_node(hp.outside_air_temp_sensor, bp.Outside_Air_Temperature_Sensor), point_ref)
-            self.add_sensor(outdoor_air_node, "System Node Relative Humidity", ahu, self.create_node(hp.outside_air_humidity_sensor, bp.Outside_Air_Humidity_Sensor), point_ref)
-            oadp = self.create_node(hp.outside_air_temp_sensor, bp.Outside_Air_Dewpoint_Sensor)
-            oadp.add_tags(['dewPoint'], h_ont)
-            self.add_sensor(outdoor_air_node, "System Node Dewpoint Temperature", ahu, oadp, point_ref)
-            self.add_sensor(outdoor_air_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.outside_air_flow_sensor, bp.Outside_Air_Flow_Sensor), point_ref)
-
-            mats = self.create_node(hp.air_temp_sensor, bp.Mixed_Air_Temperature_Sensor)
-            mats.add_tags(['mixed'], h_ont)
-            marhs = self.create_node(hp.air_humidity_sensor, bp.Mixed_Air_Humidity_Sensor)
-            marhs.add_tags(['mixed'], h_ont)
-            mafs = self.create_node(hp.air_flow_sensor, bp.Air_Flow_Sensor)
-            mafs.add_tags(['mixed'], h_ont)
-            self.add_sensor(mixed_air_node, "System Node Temperature", ahu, mats, point_ref)
-            self.add_sensor(mixed_air_node, "System Node Relative Humidity", ahu, marhs, point_ref)
-            self.add_sensor(mixed_air_node, "System Node Mass Flow Rate", ahu, mafs, point_ref)
-
-            self.add_sensor(supply_outlet_node, "System Node Temperature", ahu, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), point_ref)
-            self.add_sensor(supply_outlet_node, "System Node Relative Humidity", ahu, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), point_ref)
-            self.add_sensor(supply_outlet_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.discharge_air_flow_sensor, bp.Discharge_Air_Flow_Sensor), point_ref)
-
-            self.add_sensor(supply_inlet_node, "System Node Temperature", ahu, self.create_node(hp.return_air_temp_sensor, bp.Return_Air_Temperature_Sensor), point_ref)
-            self.add_sensor(supply_inlet_node, "System Node Relative Humidity", ahu, self.create_node(hp.return_air_humidity_sensor, bp.Return_Air_Humidity_Sensor), point_ref)
-            self.add_sensor(supply_inlet_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.return_air_flow_sensor, bp.Return_Air_Flow_Sensor), point_ref)
-
-            self.add_sensor(relief_air_node, "System Node Temperature", ahu, self.create_node(hp.exhaust_air_temp_sensor, bp.Exhaust_Air_Temperature_Sensor), point_ref)
-            self.add_sensor(relief_air_node, "System Node Relative Humidity", ahu, self.create_node(hp.exhaust_air_humidity_sensor, bp.Exhaust_Air_Humidity_Sensor), point_ref)
-            self.add_sensor(relief_air_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.exhaust_air_flow_sensor, bp.Exhaust_Air_Flow_Sensor), point_ref)
-
-            self.resolve_supply_coils(supply_context)
-            self.resolve_supply_fans(supply_context)
-
-            for node in supply_context.get_nodes_by_type(openstudio.IddObjectType("OS:HeatExchanger:AirToAir:SensibleAndLatent")):
-                heat_wheel = self.create_node(shrap.HeatRecoveryShape, be.Heat_Wheel, name=node)
-                heat_wheel.add_relationship(equip_ref, ahu)
-                erv_object = supply_context.get_object_from_node(node)
-                primary_outlet_object = erv_object.primaryAirOutletModelObject().get()
-                secondary_inlet_object = erv_object.secondaryAirInletModelObject().get()
-
-                self.add_sensor(primary_outlet_object, "System Node Temperature", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                self.add_sensor(primary_outlet_object, "System Node Relative Humidity", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Humidity_Sensor), point_ref).add_tags(['humidity'], h_ont)
-                self.add_sensor(primary_outlet_object, "System Node Mass Flow Rate", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-
-                self.add_sensor(secondary_inlet_object, "System Node Temperature", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                self.add_sensor(secondary_inlet_object, "System Node Relative Humidity", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Humidity_Sensor), point_ref).add_tags(['humidity'], h_ont)
-                self.add_sensor(secondary_inlet_object, "System Node Mass Flow Rate", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-
-            for node in supply_context.get_nodes_by_type(idd('OS:Humidifier:Steam:Electric')):
-                humidifier = self.create_node(he.humidifier_equip, be.Humidifier, name=node)
-                humidifier.add_relationship(equip_ref, ahu)
-                humidifier_object = supply_context.get_object_from_node(node)
-                outlet_object = humidifier_object.outletModelObject().get()
-
-                self.add_sensor(outlet_object, "System Node Temperature", humidifier, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), point_ref)
-                self.add_sensor(outlet_object, "System Node Mass Flow Rate", humidifier, self.create_node(hp.discharge_air_flow_sensor, bp.Discharge_Air_Flow_Sensor), point_ref)
-                self.add_sensor(outlet_object, "System Node Relative Humidity", humidifier, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), point_ref)
-
-                self.add_sensor(humidifier_object, "Humidifier Electricity Rate", humidifier, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(humidifier_object, "Humidifier Water Volume Flow Rate", humidifier, self.create_node(hp.steam_flow_sensor, bp.Water_Flow_Sensor), point_ref)
-
-            zones = demand_context.get_nodes_by_type(openstudio.IddObjectType("OS:ThermalZone"))
-            multi_zones = len(zones) > 1
-            for node in zones:
-                zone_context = demand_context.get_upstream_subgraph(node, stop_at_types=[openstudio.IddObjectType("OS:AirLoopHVAC:ZoneSplitter")])
-                zone_object = demand_context.get_object_from_node(node)
-                zone_return_object = zone_object.returnAirModelObject().get()
-                zone = self.create_node(shrap.HVACZoneShape, bz.HVAC_Zone, name=node)
-                zone_context.set_extra('zone', zone)
-                zone.add_relationship(hrefs.siteRef, site)
-
-                fcu = zone_get_fcu(zone_object)
-                if fcu:
-                    zone_context.set_extra('fcu_object', fcu)
-
-                exhaust_object = zone_get_exhaust(zone_object)
-                if exhaust_object:
-                    exhaust = self.create_node(he.fan_motor, be.Exhaust_Fan, model_object=exhaust_object)
-                    self.add_fan_points(exhaust, exhaust_object)
-                    self.add_sensor(exhaust_object, "Fan Air Mass Flow Rate", exhaust_object, self.create_node(hp.exhaust_air_flow_sensor, bp.Exhaust_Air_Flow_Sensor), point_ref)
-                    exhaust.add_relationship(air_ref, zone)
-
-
-                self.resolve_terminals(zone_context, multi_zones)
-
-                if multi_zones:
-                    self.add_sensor(zone_return_object, "System Node Temperature", zone, self.create_node(hp.return_air_temp_sensor, bp.Return_Air_Temperature_Sensor), zone_point_ref)
-                    self.add_sensor(zone_return_object, "System Node Relative Humidity", zone, self.create_node(hp.return_air_humidity_sensor, bp.Return_Air_Humidity_Sensor), zone_point_ref)
-                    self.add_sensor(zone_return_object, "System Node Mass Flow Rate", zone, self.create_node(hp.return_air_flow_sensor, bp.Return_Air_Flow_Sensor), zone_point_ref)
-
-                zat = self.create_node(hp.air_temp_sensor, bp.Zone_Air_Temperature_Sensor)
-                zat.add_tags(['zone'], h_ont)
-                self.add_sensor(zone_object.zoneAirNode(), "System Node Temperature", zone, zat, zone_point_ref)
-
-                zarh = self.create_node(hp.air_humidity_sensor, bp.Zone_Air_Humidity_Sensor)
-                zarh.add_tags(['zone'], h_ont)
-                self.add_sensor(zone_object.zoneAirNode(), "System Node Relative Humidity", zone, zarh, zone_point_ref)
-
-                zathsp = self.create_node(hp.air_temp_sp, bp.Zone_Air_Heating_Temperature_Setpoint)
-                zathsp.add_tags(['zone', 'heating'], h_ont)
-                self.add_actuator(zone_object.zoneAirNode(), "Zone Temperature Control", "Heating Setpoint", zone, zathsp, zone_point_ref)
-
-                zatcsp = self.create_node(hp.air_temp_sp, bp.Zone_Air_Cooling_Temperature_Setpoint)
-                zatcsp.add_tags(['zone', 'cooling'], h_ont)
-                self.add_actuator(zone_object.zoneAirNode(), "Zone Temperature Control", "Cooling Setpoint", zone, zatcsp, zone_point_ref)
+            self.translate_air_loop(node)
 
+        self.emit_points()
         self.sync()
+        self.manifest = point_manifest(self.state.points.values())
+        if cache_key is not None:
+            with self.profile_stage('serialization'):
+                self.cache.store(cache_key, self.graphs, self.manifest)
         return self.graphs
 
+    def translate_metadata(self, model, building_name: str):
+        """Translate without modifying model, returns the graphs and the point manifest."""
+        graphs = self.translate(model, building_name, apply_points=False)
+        return graphs, self.manifest
+
+    def translate_incremental(self, model, state=None, apply_points=True):
+        """Re-translate only the air loops and plant loops whose objects changed since state was recorded.
+
+        model is expected to be the previously translated model after editing. Scopes that are
+        unchanged keep their MetaNodes and triples, their OutputVariable and EMS objects are re-added
+        if the model no longer has them. Changed or removed scopes have their triples and model
+        objects removed before changed and new loops are translated again. With apply_points=False
+        the model is not modified and only self.manifest is updated. The previous translation must
+        have been made by a Translator created with incremental=True.
+        """
+        with self.profiling('translate incremental'):
+            return self._translate_incremental(model, state, apply_points)
+
+    def _translate_incremental(self, model, state, apply_points):
+        if state is None:
+            state = self.state
+        if state is None:
+            raise ValueError("No previous translation state to update, run translate first")
+        if not state.track_changes:
+            raise ValueError("The previous translation did not record loop fingerprints, create the Translator with incremental=True")
+        load_definitions(self.definitions_snapshot)
+        self.model = model
+        self.building_name = state.building_name
+        self.namespace = state.namespace
+        self.graphs = state.graphs
+        self.nodes = state.nodes
+        self.nodes.batch = SyncBatch() if self.deferred_sync else None
+        self.state = state
+        self.apply_points = apply_points
+        self.added_objects = []
+        self._scope_stack = []
+
+        with self.profile_stage('graph build'):
+            self.G = OpenStudioGraph(model)
+        self.G.compact_contexts = self.compact_contexts
+        self.G.set_extra('site', state.site)
+
+        fingerprints = {}
+        for node in self.G.get_nodes_by_type(openstudio.IddObjectType('OS:AirloopHVAC')):
+            _, supply_context, demand_context = self.air_loop_contexts(node)
+            fingerprints[('airloop', node)] = context_fingerprint(supply_context, demand_context)
+        for node in self.G.get_nodes_by_type(openstudio.IddObjectType('OS:PlantLoop')):
+            plant_context, plant_demand_context = self.plant_loop_contexts(self.G.get_object_from_node(node))
+            fingerprints[('plant', node)] = context_fingerprint(plant_context, plant_demand_context)
+
+        self._fingerprints = fingerprints
+        stale_keys = {key for key, scope in state.scopes.items() if fingerprints.get(key) != scope.fingerprint}
+        # loops that point at a stale plant are translated again too, so the plant gets their relationships back
+        while True:
+            dependents = {key for key, scope in state.scopes.items() if key not in stale_keys and scope.dependencies & stale_keys}
+            if not dependents:
+                break
+            stale_keys.update(dependents)
+
+        # in scope order, so MetaNodes are created again in the order of a full translation
+        stale_keys = [key for key in state.scopes if key in stale_keys]
+        removed_subjects = set()
+        stale_scopes = [state.scopes.pop(key) for key in stale_keys]
+        # MetaNodes of shared points stay while a surviving scope still uses them
+        kept = {id(node) for scope in state.scopes.values() for node in scope.nodes}
+        for scope in stale_scopes:
+            removed = [node for node in scope.nodes if id(node) not in kept]
+            self.nodes.remove(removed)
+            removed_subjects.update(subject for node in removed for subject in node.subjects())
+        remove_subjects(self.graphs, removed_subjects)
+        # a point shared with a surviving scope lost its triples with the stale one, its MetaNodes write them again
+        for node in self.nodes:
+            if any(subject in removed_subjects for subject in node.subjects()):
+                node.sync()
+
+        # points only used by stale scopes leave the model, the rest are kept or re-added
+        for point_key, point in list(state.points.items()):
+            point.scopes.difference_update(stale_keys)
+            if point.scopes:
+                if apply_points:
+                    point.ensure(model)
+            else:
+                if apply_points:
+                    point.remove(model)
+                state.remove_point(point_key)
+
+        # plants first so that re-translated air loops find them by name
+        for key in stale_keys:
+            if key[0] == 'plant' and key in fingerprints:
+                self.resolve_plant_loop(self.G.get_object_from_node(key[1]))
+        for key in fingerprints:
+            if key[0] == 'airloop' and key not in state.scopes:
+                self.translate_air_loop(key[1])
+
+        self.emit_points()
+        self.sync()
+        remove_dangling(self.graphs, self.namespace, {subject for node in self.nodes for subject in node.subjects()})
+        self.manifest = point_manifest(state.points.values())
+        return self.graphs
+
+    def write_brick(self, sink, format='turtle'):
+        # streams the Brick graph in MetaNode registry order, sink is a path or a text file object
+        with self.profile_stage('serialization'):
+            write_graph(self.graphs[(tc.BRICK, tc.V1_2_1)], sink, format, self.nodes)
+
+    def release(self):
+        # drop the model, graphs and MetaNodes of the last translation so they can be freed, the manifest is kept
+        self.model = None
+        self.G = None
+        self.graphs = None
+        self.state = None
+        self.nodes = NodeRegistry()
+        self.added_objects = []
+        self._scope_stack = []
+
+    def profile_targets(self):
+        # (owner, attribute, stage, group) patched with timed wrappers while a profiled translation runs
+        cast_stage = 'cast_openstudio_object'
+        return [
+            (GraphQueries, 'get_downstream_subgraph', 'traversal', None),
+            (GraphQueries, 'get_upstream_subgraph', 'traversal', None),
+            (GraphQueries, 'get_nodes_by_type', 'get_nodes_by_type', None),
+            (openstudio_graph, 'cast_openstudio_object', cast_stage, None),
+            (utilities, 'cast_openstudio_object', cast_stage, None),
+            (sys.modules[__name__], 'cast_openstudio_object', cast_stage, None),
+            (MetaNode, 'sync', 'MetaNode.sync', None),
+            (MetaNode, 'sync_now', 'MetaNode.sync_now', None),
+            (self, 'create_node', 'create_node', None),
+            (self, 'add_sensor', 'add_sensor', None),
+            (self, 'add_actuator', 'add_actuator', None),
+            (self, 'translate_air_loop', None, ('airloop', lambda node: self.G.get_name(node))),
+            (self, 'resolve_plant_loop', None, ('plant', lambda plant_object: plant_object.name().get())),
+        ]
+
+    @contextmanager
+    def profiling(self, stage):
+        if self.profiler is None:
+            yield
+            return
+        with self.profiler.instrument(self.profile_targets()), self.profiler.stage(stage):
+            yield
+
+    def reset_profiler(self):
+        self.profiler = Profiler(track_memory=False)
+
+    def profile_stage(self, stage):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(stage)
+
+    def profile_report(self) -> dict:
+        if self.profiler is None:
+            raise ValueError("Profiling is not enabled, create the Translator with profile=True")
+        return self.profiler.report()
+
+    def render_context(self, context, file_name):
+        if self.renderer is not None:
+            self.renderer.render(context, file_name)
+
+    def wait_for_renders(self):
+        if self.renderer is None:
+            return []
+        return self.renderer.wait()
+
+    def enter_scope(self, key, *contexts):
+        fingerprint = None
+        if self.state.track_changes:
+            fingerprint = self._fingerprints.get(key)
+            if fingerprint is None:
+                fingerprint = context_fingerprint(*contexts)
+        scope = TranslationScope(key, fingerprint)
+        self.state.scopes[key] = scope
+        self._scope_stack.append(scope)
+
+    def exit_scope(self):
+        self._scope_stack.pop()
+
+    def register_point(self, point) -> PointSpec:
+        # identical key/variable (or component/control) requests share one point
+        point = self.state.add_point(point)
+        point.scopes.add(self._scope_stack[-1].key if self._scope_stack else None)
+        return point
+
+    def emit_points(self):
+        # creates the model objects of every point registered since the last emit in one stage
+        if not self.apply_points:
+            return
+        for point in self.state.points.values():
+            if not point.objects:
+                self.added_objects.extend(point.emit(self.model))
+
+    def air_loop_contexts(self, node):
+        loop_object = self.G.get_object_from_node(node)
+        supply_context = self.G.get_downstream_subgraph(loop_object.supplyInletNode(), stop_at_nodes=[node], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
+        demand_context = self.G.get_downstream_subgraph(loop_object.demandInletNode(), stop_at_nodes=[node])
+        return loop_object, supply_context, demand_context
+
+    def translate_air_loop(self, node):
+        loop_object, supply_context, demand_context = self.air_loop_contexts(node)
+        self.enter_scope(('airloop', node), supply_context, demand_context)
+        loop_name = self.G.get_name(node)
+        site = self.G.get_extra('site')
+
+        outdoor_air_node = loop_object.outdoorAirNode().get()
+        mixed_air_node = loop_object.mixedAirNode().get()
+        supply_outlet_node = loop_object.supplyOutletNode()
+        supply_inlet_node = loop_object.supplyInletNode()
+        relief_air_node = loop_object.reliefAirNode().get()
+
+        unitary_hps = supply_context.get_nodes_by_type(idd('OS:AirLoopHVAC:UnitarySystem'))
+        if len(unitary_hps) > 0:
+            unitary_hp = unitary_hps[0]
+            ahu = self.create_node(he.heatPump, be.AHU, name=self.G.get_name(unitary_hp))
+            unitary_hp_object = supply_context.get_object_from_node(unitary_hp)
+            heating_coil_object = unitary_hp_object.heatingCoil()
+            cooling_coil_object = unitary_hp_object.coolingCoil()
+            supply_fan_object = unitary_hp_object.supplyFan()
+            supplemental_heating_coil_object = unitary_hp_object.supplementalHeatingCoil()
+
+            if heating_coil_object.is_initialized():
+                heating_coil_object = heating_coil_object.get()
+                heating_coil = self.tag_coil(heating_coil_object)
+                self.add_coil_capacity_points(heating_coil, heating_coil_object)
+                heating_coil.add_relationship(equip_ref, ahu)
+
+            if supplemental_heating_coil_object.is_initialized():
+                supplemental_heating_coil_object = supplemental_heating_coil_object.get()
+                supplemental_heating_coil = self.tag_coil(supplemental_heating_coil_object)
+                self.add_coil_capacity_points(supplemental_heating_coil, supplemental_heating_coil_object)
+                supplemental_heating_coil.add_relationship(equip_ref, ahu)
+
+            if cooling_coil_object.is_initialized():
+                cooling_coil_object = cooling_coil_object.get()
+                cooling_coil = self.tag_coil(cooling_coil_object)
+                self.add_coil_capacity_points(cooling_coil, cooling_coil_object)
+                cooling_coil.add_relationship(equip_ref, ahu)
+
+            if supply_fan_object.is_initialized():
+                supply_fan = self.tag_discharge_fan(supply_fan_object.get())
+                supply_fan.add_relationship(equip_ref, ahu)
+        elif "DOAS" in loop_name.upper():
+            ahu = self.create_node(he.doas, be.DOAS, name=loop_name)
+        else:
+            ahu = self.create_node(he.ahu, be.AHU, name=loop_name)
+        ahu.add_relationship(site_ref, site)
+
+        supply_context.set_extra('ahu', ahu)
+        self.render_context(supply_context, loop_name)
+        demand_context.set_extra('ahu', ahu)
+        self.render_context(demand_context, f"{loop_name}_demand")
+
+        self.add_sensor(outdoor_air_node, "System Node Temperature", ahu, self.create_node(hp.outside_air_temp_sensor, bp.Outside_Air_Temperature_Sensor), point_ref)
+        self.add_sensor(outdoor_air_node, "System Node Relative Humidity", ahu, self.create_node(hp.outside_air_humidity_sensor, bp.Outside_Air_Humidity_Sensor), point_ref)
+        oadp = self.create_node(hp.outside_air_temp_sensor, bp.Outside_Air_Dewpoint_Sensor)
+        oadp.add_tags(['dewPoint'], h_ont)
+        self.add_sensor(outdoor_air_node, "System Node Dewpoint Temperature", ahu, oadp, point_ref)
+        self.add_sensor(outdoor_air_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.outside_air_flow_sensor, bp.Outside_Air_Flow_Sensor), point_ref)
+
+        mats = self.create_node(hp.air_temp_sensor, bp.Mixed_Air_Temperature_Sensor)
+        mats.add_tags(['mixed'], h_ont)
+        marhs = self.create_node(hp.air_humidity_sensor, bp.Mixed_Air_Humidity_Sensor)
+        marhs.add_tags(['mixed'], h_ont)
+        mafs = self.create_node(hp.air_flow_sensor, bp.Air_Flow_Sensor)
+        mafs.add_tags(['mixed'], h_ont)
+        self.add_sensor(mixed_air_node, "System Node Temperature", ahu, mats, point_ref)
+        self.add_sensor(mixed_air_node, "System Node Relative Humidity", ahu, marhs, point_ref)
+        self.add_sensor(mixed_air_node, "System Node Mass Flow Rate", ahu, mafs, point_ref)
+
+        self.add_sensor(supply_outlet_node, "System Node Temperature", ahu, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), point_ref)
+        self.add_sensor(supply_outlet_node, "System Node Relative Humidity", ahu, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), point_ref)
+        self.add_sensor(supply_outlet_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.discharge_air_flow_sensor, bp.Discharge_Air_Flow_Sensor), point_ref)
+
+        self.add_sensor(supply_inlet_node, "System Node Temperature", ahu, self.create_node(hp.return_air_temp_sensor, bp.Return_Air_Temperature_Sensor), point_ref)
+        self.add_sensor(supply_inlet_node, "System Node Relative Humidity", ahu, self.create_node(hp.return_air_humidity_sensor, bp.Return_Air_Humidity_Sensor), point_ref)
+        self.add_sensor(supply_inlet_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.return_air_flow_sensor, bp.Return_Air_Flow_Sensor), point_ref)
+
+        self.add_sensor(relief_air_node, "System Node Temperature", ahu, self.create_node(hp.exhaust_air_temp_sensor, bp.Exhaust_Air_Temperature_Sensor), point_ref)
+        self.add_sensor(relief_air_node, "System Node Relative Humidity", ahu, self.create_node(hp.exhaust_air_humidity_sensor, bp.Exhaust_Air_Humidity_Sensor), point_ref)
+        self.add_sensor(relief_air_node, "System Node Mass Flow Rate", ahu, self.create_node(hp.exhaust_air_flow_sensor, bp.Exhaust_Air_Flow_Sensor), point_ref)
+
+        self.supply_rules.dispatch(self, supply_context)
+
+        zones = demand_context.get_nodes_by_type(openstudio.IddObjectType("OS:ThermalZone"))
+        multi_zones = len(zones) > 1
+        for node in zones:
+            zone_context = demand_context.get_upstream_subgraph(node, stop_at_types=[openstudio.IddObjectType("OS:AirLoopHVAC:ZoneSplitter")])
+            zone_object = demand_context.get_object_from_node(node)
+            zone_return_object = zone_object.returnAirModelObject().get()
+            zone = self.create_node(shrap.HVACZoneShape, bz.HVAC_Zone, name=self.G.get_name(node))
+            zone_context.set_extra('zone', zone)
+            zone.add_relationship(hrefs.siteRef, site)
+
+            fcu = zone_get_fcu(zone_object)
+            if fcu:
+                zone_context.set_extra('fcu_object', fcu)
+
+            exhaust_object = zone_get_exhaust(zone_object)
+            if exhaust_object:
+                exhaust = self.create_node(he.fan_motor, be.Exhaust_Fan, model_object=exhaust_object)
+                self.add_fan_points(exhaust, exhaust_object)
+                self.add_sensor(exhaust_object, "Fan Air Mass Flow Rate", exhaust_object, self.create_node(hp.exhaust_air_flow_sensor, bp.Exhaust_Air_Flow_Sensor), point_ref)
+                exhaust.add_relationship(air_ref, zone)
+
+
+            self.resolve_terminals(zone_context, multi_zones)
+
+            if multi_zones:
+                self.add_sensor(zone_return_object, "System Node Temperature", zone, self.create_node(hp.return_air_temp_sensor, bp.Return_Air_Temperature_Sensor), zone_point_ref)
+                self.add_sensor(zone_return_object, "System Node Relative Humidity", zone, self.create_node(hp.return_air_humidity_sensor, bp.Return_Air_Humidity_Sensor), zone_point_ref)
+                self.add_sensor(zone_return_object, "System Node Mass Flow Rate", zone, self.create_node(hp.return_air_flow_sensor, bp.Return_Air_Flow_Sensor), zone_point_ref)
+
+            zat = self.create_node(hp.air_temp_sensor, bp.Zone_Air_Temperature_Sensor)
+            zat.add_tags(['zone'], h_ont)
+            self.add_sensor(zone_object.zoneAirNode(), "System Node Temperature", zone, zat, zone_point_ref)
+
+            zarh = self.create_node(hp.air_humidity_sensor, bp.Zone_Air_Humidity_Sensor)
+            zarh.add_tags(['zone'], h_ont)
+            self.add_sensor(zone_object.zoneAirNode(), "System Node Relative Humidity", zone, zarh, zone_point_ref)
+
+            zathsp = self.create_node(hp.air_temp_sp, bp.Zone_Air_Heating_Temperature_Setpoint)
+            zathsp.add_tags(['zone', 'heating'], h_ont)
+            self.add_actuator(zone_object.zoneAirNode(), "Zone Temperature Control", "Heating Setpoint", zone, zathsp, zone_point_ref)
+
+            zatcsp = self.create_node(hp.air_temp_sp, bp.Zone_Air_Cooling_Temperature_Setpoint)
+            zatcsp.add_tags(['zone', 'cooling'], h_ont)
+            self.add_actuator(zone_object.zoneAirNode(), "Zone Temperature Control", "Cooling Setpoint", zone, zatcsp, zone_point_ref)
+
+        self.exit_scope()
+
     def resolve_plant_loop(self, plant_object) -> MetaNode:
         plant_loop_name = name_to_id(plant_object.name().get())
+        plant_key = ('plant', str(plant_object.handle()))
         plant = self.get_node_by_name(plant_loop_name)
         if plant is None:
+            plant_context, plant_demand_context = self.plant_loop_contexts(plant_object)
+            self.enter_scope(plant_key, plant_context, plant_demand_context)
             site = self.G.get_extra('site')
             plant_type = PlantType.plant_type_from_object(plant_object)
             supply_inlet_node = plant_object.supplyInletNode()
@@ -261,12 +595,9 @@ class Translator:
             elif plant_type == PlantType.CONDENSER_WATER:
                 plant = self.create_node(he.chilled_water_plant, bs.Condenser_Water_System, name=plant_loop_name)
 
-            plant_context = self.G.get_downstream_subgraph(supply_inlet_node.name().get(), stop_at_nodes=[plant_object.name().get()], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
             plant_context.set_extra('plant', plant)
             plant.add_relationship(site_ref, site)
 
-            plant_demand_context = self.G.get_downstream_subgraph(demand_inlet_node.name().get(), stop_at_nodes=plant_object.name().get())
-
             if plant_type == PlantType.HOT_WATER:
                 self.add_sensor(demand_outlet_object, "System Node Temperature", plant, self.create_node(hp.leaving_hot_water_temp_sensor, bp.Hot_Water_Return_Temperature_Sensor), point_ref)
                 self.add_sensor(demand_outlet_object, "System Node Mass Flow Rate", plant, self.create_node(hp.leaving_hot_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
@@ -292,161 +623,169 @@ class Translator:
                 self.add_sensor(supply_outlet_object, "System Node Mass Flow Rate", plant, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Supply_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
                 self.add_actuator(supply_outlet_object, "System Node Setpoint", "Temperature Setpoint", plant, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Supply_Condenser_Water_Temperature_Setpoint), point_ref).add_tags(['entering'], h_ont)
 
-            nx.nx_pydot.to_pydot(plant_context).write_png(f"{plant_loop_name}.png")
-            nx.nx_pydot.to_pydot(plant_demand_context).write_png(f"{plant_loop_name}_demand_equip.png")
+            self.render_context(plant_context, plant_loop_name)
+            self.render_context(plant_demand_context, f"{plant_loop_name}_demand_equip")
 
             supply_equip_context = plant_context.get_downstream_subgraph(plant_object.supplySplitter(), stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
-            nx.nx_pydot.to_pydot(supply_equip_context).write_png(f'{plant_loop_name}_supply_equip.png')
-
-            flow_sensor_tagging = {
-                PlantType.HOT_WATER: [hp.hot_water_flow_sensor, bp.Hot_Water_Flow_Sensor],
-                PlantType.CHILLED_WATER: [hp.chilled_water_flow_sensor, bp.Water_Flow_Sensor],
-                PlantType.CONDENSER_WATER: [shrap.CondenserWaterFlowSensorShape, bp.Water_Flow_Sensor]
-            }
-            for node in plant_context.get_nodes_by_type(openstudio.IddObjectType("OS:Pump:VariableSpeed")):
-                pump_object = plant_context.get_object_from_node(node)
-                pump = self.create_node(he.pump_motor, be.Pump_VFD, name=node)
-                self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*flow_sensor_tagging[plant_type]), point_ref)
-                plant_context.set_extra("primary_pump", pump)
+            self.render_context(supply_equip_context, f'{plant_loop_name}_supply_equip')
 
-            for node in plant_context.get_nodes_by_type(openstudio.IddObjectType("OS:Pump:ConstantSpeed")):
-                pump_object = plant_context.get_object_from_node(node)
-                pump = self.create_node(he.pump_motor, be.Water_Pump, name=node)
-                self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*flow_sensor_tagging[plant_type]), point_ref)
-                plant_context.set_extra("primary_pump", pump)
-
-            for node in supply_equip_context.get_nodes_by_type(openstudio.IddObjectType("OS:Boiler:HotWater")):
-                boiler_object = plant_context.get_object_from_node(node)
-                boiler = self.create_node(he.boiler, be.Boiler, name=node)
-                boiler_inlet_object = boiler_object.inletModelObject().get()
-                boiler_outlet_object = boiler_object.outletModelObject().get()
-                boiler.add_relationship(site_ref, site)
-                boiler.add_relationship(equip_ref, plant)
-                self.add_sensor(boiler_object, "Boiler Natural Gas Rate", boiler, self.create_node(shrap.GasEnergySensorShape, bp.Energy_Sensor), point_ref)
-                self.add_sensor(boiler_object, "Boiler Heating Rate", boiler, self.create_node(shrap.HeatingCapacitySensorShape, bp.Thermal_Power_Sensor), point_ref)
-
-                self.add_sensor(boiler_inlet_object, "System Node Temperature", boiler, self.create_node(hp.entering_hot_water_temp_sensor, bp.Hot_Water_Return_Temperature_Sensor), point_ref)
-                self.add_sensor(boiler_inlet_object, "System Node Mass Flow Rate", boiler, self.create_node(hp.entering_hot_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
-                self.add_actuator(boiler_inlet_object, "System Node Setpoint", "Temperature Setpoint", boiler, self.create_node(hp.entering_hot_water_temp_sp, bp.Return_Hot_Water_Temperature_Setpoint), point_ref)
-
-                self.add_sensor(boiler_outlet_object, "System Node Temperature", boiler, self.create_node(hp.leaving_hot_water_temp_sensor, bp.Hot_Water_Supply_Temperature_Sensor), point_ref)
-                self.add_sensor(boiler_outlet_object, "System Node Mass Flow Rate", boiler, self.create_node(hp.leaving_hot_water_flow_sensor, bp.Hot_Water_Supply_Flow_Sensor), point_ref)
-                self.add_actuator(boiler_outlet_object, "System Node Setpoint", "Temperature Setpoint", boiler, self.create_node(hp.leaving_hot_water_temp_sp, bp.Supply_Hot_Water_Temperature_Setpoint), point_ref)
-                plant_context.get_extra("primary_pump").add_relationship(equip_ref, boiler)
-
-            for node in supply_equip_context.get_nodes_by_type(openstudio.IddObjectType("OS:Chiller:Electric:EIR")):
-                chiller_object = plant_context.get_object_from_node(node)
-                chiller = self.create_node(he.chiller, be.Chiller, name=node)
-                chiller_inlet_object = chiller_object.supplyInletModelObject().get()
-                chiller_outlet_object = chiller_object.supplyOutletModelObject().get()
-                chiller.add_relationship(site_ref, site)
-                chiller.add_relationship(equip_ref, plant)
-                self.add_sensor(chiller_object, "Chiller Electricity Rate", chiller, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(chiller_object, "Chiller Evaporator Cooling Rate", chiller, self.create_node(shrap.CoolingCapacitySensorShape, bp.Thermal_Power_Sensor), point_ref)
-
-                self.add_sensor(chiller_inlet_object, "System Node Temperature", chiller, self.create_node(hp.entering_chilled_water_temp_sensor, bp.Chilled_Water_Return_Temperature_Sensor), point_ref)
-                self.add_sensor(chiller_inlet_object, "System Node Mass Flow Rate", chiller, self.create_node(hp.entering_chilled_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
-                self.add_actuator(chiller_inlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(hp.entering_chilled_water_temp_sp, bp.Return_Chilled_Water_Temperature_Setpoint), point_ref)
-
-                self.add_sensor(chiller_outlet_object, "System Node Temperature", chiller, self.create_node(hp.leaving_chilled_water_temp_sensor, bp.Chilled_Water_Supply_Temperature_Sensor), point_ref)
-                self.add_sensor(chiller_outlet_object, "System Node Mass Flow Rate", chiller, self.create_node(hp.leaving_chilled_water_flow_sensor, bp.Chilled_Water_Supply_Flow_Sensor), point_ref)
-                self.add_actuator(chiller_outlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(hp.leaving_chilled_water_temp_sp, bp.Supply_Chilled_Water_Temperature_Setpoint), point_ref)
-
-                plant_context.get_extra("primary_pump").add_relationship(equip_ref, chiller)
-
-                if chiller_object.condenserWaterLoop().is_initialized():
-                    print("Resolving Condenser Loop")
-                    condenser_loop = self.resolve_plant_loop(chiller_object.condenserWaterLoop().get())
-                    chiller_demand_inlet_object = chiller_object.demandInletModelObject().get()
-                    chiller_demand_outlet_object = chiller_object.demandOutletModelObject().get()
-                    chiller.add_relationship(MetaRef(hrefs.condenserWaterRef, brefs.isFedBy), condenser_loop)
-
-                    self.add_sensor(chiller_demand_outlet_object, "System Node Temperature", chiller, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Return_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                    self.add_sensor(chiller_demand_outlet_object, "System Node Mass Flow Rate", chiller, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Return_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-                    self.add_actuator(chiller_demand_outlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Return_Water_Temperature_Setpoint), point_ref).add_tags(['leaving'], h_ont)
-
-                    self.add_sensor(chiller_demand_inlet_object, "System Node Temperature", chiller, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Supply_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                    self.add_sensor(chiller_demand_inlet_object, "System Node Mass Flow Rate", chiller, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Supply_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-                    self.add_actuator(chiller_demand_inlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Supply_Condenser_Water_Temperature_Setpoint), point_ref).add_tags(['entering'], h_ont)
-
-            for node in supply_equip_context.get_nodes_by_type(openstudio.IddObjectType("OS:Pipe:Adiabatic")):
-                pipe_object = plant_context.get_object_from_node(node)
-                pipe_inlet_object = pipe_object.inletModelObject().get()
-                if plant_type == PlantType.CHILLED_WATER:
-                    self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(hp.bypass_chilled_water_flow_sensor, bp.Bypass_Water_Flow_Sensor), point_ref)
-                elif plant_type == PlantType.HOT_WATER:
-                    self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(hp.bypass_hot_water_flow_sensor, bp.Bypass_Water_Flow_Sensor), point_ref)
-                elif plant_type == PlantType.CONDENSER_WATER:
-                    self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(shrap.CondenserWaterBypassFlowSensorShape, bp.Bypass_Water_Flow_Sensor), point_ref)
-                
-            for node in supply_equip_context.get_nodes_by_type(idd('OS:CoolingTower:VariableSpeed')):
-                cooling_tower = self.create_node(he.coolingTower, be.Cooling_Tower, name=node)
-                cooling_tower.add_relationship(site_ref, site)
-                cooling_tower.add_relationship(equip_ref, plant)
-                cooling_tower_object = supply_equip_context.get_object_from_node(node)
-                cooling_tower_inlet_object = cooling_tower_object.inletModelObject().get()
-                cooling_tower_outlet_object = cooling_tower_object.outletModelObject().get()
-
-                self.add_sensor(cooling_tower_object, "Cooling Tower Fan Electricity Rate", cooling_tower, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-
-
-                self.add_sensor(cooling_tower_inlet_object, "System Node Temperature", cooling_tower, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Return_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                self.add_sensor(cooling_tower_inlet_object, "System Node Mass Flow Rate", cooling_tower, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Return_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-                self.add_actuator(cooling_tower_inlet_object, "System Node Setpoint", "Temperature Setpoint", cooling_tower, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Return_Water_Temperature_Setpoint), point_ref).add_tags(['entering'], h_ont)
-
-                self.add_sensor(cooling_tower_outlet_object, "System Node Temperature", cooling_tower, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Supply_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
-                self.add_sensor(cooling_tower_outlet_object, "System Node Mass Flow Rate", cooling_tower, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Supply_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
-                self.add_actuator(cooling_tower_outlet_object, "System Node Setpoint", "Temperature Setpoint", cooling_tower, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Supply_Condenser_Water_Temperature_Setpoint), point_ref).add_tags(['leaving'], h_ont)
-                
-                plant_context.get_extra("primary_pump").add_relationship(equip_ref, cooling_tower)
+            plant_context.set_extra('plant_type', plant_type)
+            self.plant_pump_rules.dispatch(self, plant_context)
+            self.plant_equipment_rules.dispatch(self, supply_equip_context, plant_context)
 
             for pump_object in plant_object.demandComponents(idd("OS:Pump:VariableSpeed")):
                 pump = self.create_node(he.pump_motor, be.Pump_VFD, model_object=pump_object)
                 self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*flow_sensor_tagging[plant_type]), point_ref)
+                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*self.flow_sensor_shapes(plant_type)), point_ref)
                 pump.add_relationship(equip_ref, plant)
 
             for pump_object in plant_object.demandComponents(idd("OS:Pump:ConstantSpeed")):
                 pump = self.create_node(he.pump_motor, be.Water_Pump, model_object=pump_object)
                 self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*flow_sensor_tagging[plant_type]), point_ref)
+                self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*self.flow_sensor_shapes(plant_type)), point_ref)
                 pump.add_relationship(equip_ref, plant)
 
+            self.exit_scope()
+
+        if self._scope_stack:
+            self._scope_stack[-1].dependencies.add(plant_key)
         return plant
 
+    def flow_sensor_shapes(self, plant_type):
+        return {
+            PlantType.HOT_WATER: [hp.hot_water_flow_sensor, bp.Hot_Water_Flow_Sensor],
+            PlantType.CHILLED_WATER: [hp.chilled_water_flow_sensor, bp.Water_Flow_Sensor],
+            PlantType.CONDENSER_WATER: [shrap.CondenserWaterFlowSensorShape, bp.Water_Flow_Sensor]
+        }[plant_type]
+
+    @plant_pump_rules.rule("OS:Pump:VariableSpeed")
+    def resolve_variable_speed_pump(self, context, node):
+        pump_object = context.get_object_from_node(node)
+        pump = self.create_node(he.pump_motor, be.Pump_VFD, name=self.G.get_name(node))
+        self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*self.flow_sensor_shapes(context.get_extra('plant_type'))), point_ref)
+        context.set_extra("primary_pump", pump)
+
+    @plant_pump_rules.rule("OS:Pump:ConstantSpeed")
+    def resolve_constant_speed_pump(self, context, node):
+        pump_object = context.get_object_from_node(node)
+        pump = self.create_node(he.pump_motor, be.Water_Pump, name=self.G.get_name(node))
+        self.add_sensor(pump_object, "Pump Electricity Rate", pump, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_sensor(pump_object, "Pump Mass Flow Rate", pump, self.create_node(*self.flow_sensor_shapes(context.get_extra('plant_type'))), point_ref)
+        context.set_extra("primary_pump", pump)
+
+    @plant_equipment_rules.rule("OS:Boiler:HotWater")
+    def resolve_boiler(self, context, node, plant_context):
+        plant = plant_context.get_extra('plant')
+        site = self.G.get_extra('site')
+        boiler_object = context.get_object_from_node(node)
+        boiler = self.create_node(he.boiler, be.Boiler, name=self.G.get_name(node))
+        boiler_inlet_object = boiler_object.inletModelObject().get()
+        boiler_outlet_object = boiler_object.outletModelObject().get()
+        boiler.add_relationship(site_ref, site)
+        boiler.add_relationship(equip_ref, plant)
+        self.add_sensor(boiler_object, "Boiler Natural Gas Rate", boiler, self.create_node(shrap.GasEnergySensorShape, bp.Energy_Sensor), point_ref)
+        self.add_sensor(boiler_object, "Boiler Heating Rate", boiler, self.create_node(shrap.HeatingCapacitySensorShape, bp.Thermal_Power_Sensor), point_ref)
+
+        self.add_sensor(boiler_inlet_object, "System Node Temperature", boiler, self.create_node(hp.entering_hot_water_temp_sensor, bp.Hot_Water_Return_Temperature_Sensor), point_ref)
+        self.add_sensor(boiler_inlet_object, "System Node Mass Flow Rate", boiler, self.create_node(hp.entering_hot_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
+        self.add_actuator(boiler_inlet_object, "System Node Setpoint", "Temperature Setpoint", boiler, self.create_node(hp.entering_hot_water_temp_sp, bp.Return_Hot_Water_Temperature_Setpoint), point_ref)
+
+        self.add_sensor(boiler_outlet_object, "System Node Temperature", boiler, self.create_node(hp.leaving_hot_water_temp_sensor, bp.Hot_Water_Supply_Temperature_Sensor), point_ref)
+        self.add_sensor(boiler_outlet_object, "System Node Mass Flow Rate", boiler, self.create_node(hp.leaving_hot_water_flow_sensor, bp.Hot_Water_Supply_Flow_Sensor), point_ref)
+        self.add_actuator(boiler_outlet_object, "System Node Setpoint", "Temperature Setpoint", boiler, self.create_node(hp.leaving_hot_water_temp_sp, bp.Supply_Hot_Water_Temperature_Setpoint), point_ref)
+        plant_context.get_extra("primary_pump").add_relationship(equip_ref, boiler)
+
+    @plant_equipment_rules.rule("OS:Chiller:Electric:EIR")
+    def resolve_chiller(self, context, node, plant_context):
+        plant = plant_context.get_extra('plant')
+        site = self.G.get_extra('site')
+        chiller_object = context.get_object_from_node(node)
+        chiller = self.create_node(he.chiller, be.Chiller, name=self.G.get_name(node))
+        chiller_inlet_object = chiller_object.supplyInletModelObject().get()
+        chiller_outlet_object = chiller_object.supplyOutletModelObject().get()
+        chiller.add_relationship(site_ref, site)
+        chiller.add_relationship(equip_ref, plant)
+        self.add_sensor(chiller_object, "Chiller Electricity Rate", chiller, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_sensor(chiller_object, "Chiller Evaporator Cooling Rate", chiller, self.create_node(shrap.CoolingCapacitySensorShape, bp.Thermal_Power_Sensor), point_ref)
+
+        self.add_sensor(chiller_inlet_object, "System Node Temperature", chiller, self.create_node(hp.entering_chilled_water_temp_sensor, bp.Chilled_Water_Return_Temperature_Sensor), point_ref)
+        self.add_sensor(chiller_inlet_object, "System Node Mass Flow Rate", chiller, self.create_node(hp.entering_chilled_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
+        self.add_actuator(chiller_inlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(hp.entering_chilled_water_temp_sp, bp.Return_Chilled_Water_Temperature_Setpoint), point_ref)
+
+        self.add_sensor(chiller_outlet_object, "System Node Temperature", chiller, self.create_node(hp.leaving_chilled_water_temp_sensor, bp.Chilled_Water_Supply_Temperature_Sensor), point_ref)
+        self.add_sensor(chiller_outlet_object, "System Node Mass Flow Rate", chiller, self.create_node(hp.leaving_chilled_water_flow_sensor, bp.Chilled_Water_Supply_Flow_Sensor), point_ref)
+        self.add_actuator(chiller_outlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(hp.leaving_chilled_water_temp_sp, bp.Supply_Chilled_Water_Temperature_Setpoint), point_ref)
+
+        plant_context.get_extra("primary_pump").add_relationship(equip_ref, chiller)
+
+        if chiller_object.condenserWaterLoop().is_initialized():
+            print("Resolving Condenser Loop")
+            condenser_loop = self.resolve_plant_loop(chiller_object.condenserWaterLoop().get())
+            chiller_demand_inlet_object = chiller_object.demandInletModelObject().get()
+            chiller_demand_outlet_object = chiller_object.demandOutletModelObject().get()
+            chiller.add_relationship(MetaRef(hrefs.condenserWaterRef, brefs.isFedBy), condenser_loop)
+
+            self.add_sensor(chiller_demand_outlet_object, "System Node Temperature", chiller, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Return_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+            self.add_sensor(chiller_demand_outlet_object, "System Node Mass Flow Rate", chiller, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Return_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+            self.add_actuator(chiller_demand_outlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Return_Water_Temperature_Setpoint), point_ref).add_tags(['leaving'], h_ont)
+
+            self.add_sensor(chiller_demand_inlet_object, "System Node Temperature", chiller, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Supply_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+            self.add_sensor(chiller_demand_inlet_object, "System Node Mass Flow Rate", chiller, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Supply_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+            self.add_actuator(chiller_demand_inlet_object, "System Node Setpoint", "Temperature Setpoint", chiller, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Supply_Condenser_Water_Temperature_Setpoint), point_ref).add_tags(['entering'], h_ont)
+
+    @plant_equipment_rules.rule("OS:Pipe:Adiabatic")
+    def resolve_bypass_pipe(self, context, node, plant_context):
+        plant = plant_context.get_extra('plant')
+        plant_type = plant_context.get_extra('plant_type')
+        pipe_object = context.get_object_from_node(node)
+        pipe_inlet_object = pipe_object.inletModelObject().get()
+        if plant_type == PlantType.CHILLED_WATER:
+            self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(hp.bypass_chilled_water_flow_sensor, bp.Bypass_Water_Flow_Sensor), point_ref)
+        elif plant_type == PlantType.HOT_WATER:
+            self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(hp.bypass_hot_water_flow_sensor, bp.Bypass_Water_Flow_Sensor), point_ref)
+        elif plant_type == PlantType.CONDENSER_WATER:
+            self.add_sensor(pipe_inlet_object, "System Node Mass Flow Rate", plant, self.create_node(shrap.CondenserWaterBypassFlowSensorShape, bp.Bypass_Water_Flow_Sensor), point_ref)
+
+    @plant_equipment_rules.rule("OS:CoolingTower:VariableSpeed")
+    def resolve_cooling_tower(self, context, node, plant_context):
+        plant = plant_context.get_extra('plant')
+        site = self.G.get_extra('site')
+        cooling_tower = self.create_node(he.coolingTower, be.Cooling_Tower, name=self.G.get_name(node))
+        cooling_tower.add_relationship(site_ref, site)
+        cooling_tower.add_relationship(equip_ref, plant)
+        cooling_tower_object = context.get_object_from_node(node)
+        cooling_tower_inlet_object = cooling_tower_object.inletModelObject().get()
+        cooling_tower_outlet_object = cooling_tower_object.outletModelObject().get()
+
+        self.add_sensor(cooling_tower_object, "Cooling Tower Fan Electricity Rate", cooling_tower, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+
+
+        self.add_sensor(cooling_tower_inlet_object, "System Node Temperature", cooling_tower, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Return_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+        self.add_sensor(cooling_tower_inlet_object, "System Node Mass Flow Rate", cooling_tower, self.create_node(shrap.EnteringCondenserWaterSensorShape, bp.Return_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+        self.add_actuator(cooling_tower_inlet_object, "System Node Setpoint", "Temperature Setpoint", cooling_tower, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Return_Water_Temperature_Setpoint), point_ref).add_tags(['entering'], h_ont)
+
+        self.add_sensor(cooling_tower_outlet_object, "System Node Temperature", cooling_tower, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Supply_Condenser_Water_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+        self.add_sensor(cooling_tower_outlet_object, "System Node Mass Flow Rate", cooling_tower, self.create_node(shrap.LeavingCondenserWaterSensorShape, bp.Supply_Condenser_Water_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+        self.add_actuator(cooling_tower_outlet_object, "System Node Setpoint", "Temperature Setpoint", cooling_tower, self.create_node(shrap.CondenserWaterTemperatureSetpointShape, bp.Supply_Condenser_Water_Temperature_Setpoint), point_ref).add_tags(['leaving'], h_ont)
+
+        plant_context.get_extra("primary_pump").add_relationship(equip_ref, cooling_tower)
+
+    def plant_loop_contexts(self, plant_object):
+        plant_context = self.G.get_downstream_subgraph(plant_object.supplyInletNode(), stop_at_nodes=[plant_object], stop_at_types=[openstudio.IddObjectType('OS:Connector:Mixer')])
+        plant_demand_context = self.G.get_downstream_subgraph(plant_object.demandInletNode(), stop_at_nodes=[plant_object])
+        return plant_context, plant_demand_context
+
 
     def resolve_terminals(self, context, multi_zones):
         ahu = context.get_extra('ahu')
         zone = context.get_extra('zone')
-        fcu_object = context.get_extra('fcu_object')
-        reheat_coil_object = None
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:AirTerminal:SingleDuct:VAV:Reheat")):
-            terminal_object = context.get_object_from_node(node)
-            terminal_inlet_object = terminal_object.inletModelObject().get()
-
-            terminal = self.create_node(he.vav, be.RVAV, name=node)
-            reheat_coil_object = terminal_object.reheatCoil()
-            self.add_terminal_coil(context, reheat_coil_object, terminal_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:AirTerminal:SingleDuct:ConstantVolume:NoReheat")):
-            terminal_object = context.get_object_from_node(node)
-            terminal_inlet_object = terminal_object.inletModelObject().get()
-
-            if fcu_object is not None:
-                terminal = self.create_node(he.fcu, be.Fan_Coil_Unit, model_object=fcu_object)
-                context.set_extra('terminal', terminal)
-                coolingCoil = cast_openstudio_object(fcu_object.coolingCoil())
-                heatingCoil = cast_openstudio_object(fcu_object.heatingCoil())
-                fan_object = cast_openstudio_object(fcu_object.supplyAirFan())
-                self.add_terminal_coil(context, coolingCoil, terminal_object)
-                self.add_terminal_coil(context, heatingCoil, terminal_object)
-                fan = self.tag_discharge_fan(fan_object)
-                fan.add_relationship(equip_ref, terminal)
-            else:
-                terminal = self.create_node(he.cav, be.CAV, name=node)
-
+        self.terminal_rules.dispatch(self, context)
+        terminal = context.get_extra('terminal')
+        terminal_object = context.get_extra('terminal_object')
+        if terminal is None:
+            return
+        terminal_inlet_object = terminal_object.inletModelObject().get()
 
         terminal.add_relationship(air_ref, ahu)
         terminal.add_relationship(space_ref, zone)
@@ -455,12 +794,38 @@ class Translator:
         self.add_empty_actuator(terminal_object, "Zone Air Terminal VAV Damper Position", terminal, damper_position_command, point_ref)
         self.add_empty_actuator(terminal_object, "Zone Air Terminal Minimum Air Flow Fraction", terminal, self.create_node(shrap.MinAirFractionSetpointShape, bp.Min_Position_Setpoint_Limit), point_ref)
 
-        context.set_extra('terminal', terminal)
         if multi_zones:
             self.add_sensor(terminal_inlet_object, "System Node Temperature", terminal, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), zone_point_ref)
             self.add_sensor(terminal_inlet_object, "System Node Mass Flow Rate", terminal, self.create_node(hp.discharge_air_flow_sensor, bp.Discharge_Air_Flow_Sensor), zone_point_ref)
             self.add_sensor(terminal_inlet_object, "System Node Relative Humidity", terminal, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), zone_point_ref)
 
+    @terminal_rules.rule("OS:AirTerminal:SingleDuct:VAV:Reheat")
+    def resolve_vav_reheat_terminal(self, context, node):
+        terminal_object = context.get_object_from_node(node)
+        terminal = self.create_node(he.vav, be.RVAV, name=self.G.get_name(node))
+        self.add_terminal_coil(context, terminal_object.reheatCoil(), terminal_object)
+        context.set_extra('terminal', terminal)
+        context.set_extra('terminal_object', terminal_object)
+
+    @terminal_rules.rule("OS:AirTerminal:SingleDuct:ConstantVolume:NoReheat")
+    def resolve_constant_volume_terminal(self, context, node):
+        terminal_object = context.get_object_from_node(node)
+        fcu_object = context.get_extra('fcu_object')
+        if fcu_object is not None:
+            terminal = self.create_node(he.fcu, be.Fan_Coil_Unit, model_object=fcu_object)
+            context.set_extra('terminal', terminal)
+            coolingCoil = cast_openstudio_object(fcu_object.coolingCoil())
+            heatingCoil = cast_openstudio_object(fcu_object.heatingCoil())
+            fan_object = cast_openstudio_object(fcu_object.supplyAirFan())
+            self.add_terminal_coil(context, coolingCoil, terminal_object)
+            self.add_terminal_coil(context, heatingCoil, terminal_object)
+            fan = self.tag_discharge_fan(fan_object)
+            fan.add_relationship(equip_ref, terminal)
+        else:
+            terminal = self.create_node(he.cav, be.CAV, name=self.G.get_name(node))
+        context.set_extra('terminal', terminal)
+        context.set_extra('terminal_object', terminal_object)
+
     def tag_coil(self, coil_object):
         idd_type = coil_object.iddObjectType()
         if idd_type == idd("OS:Coil:Heating:Electric"):
@@ -528,19 +893,118 @@ class Translator:
         self.add_sensor(terminal_outlet_object, "System Node Temperature", coil, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), point_ref)
         self.add_sensor(terminal_outlet_object, "System Node Relative Humidity", coil, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), point_ref)
 
-    def resolve_supply_fans(self, context):
+    @supply_rules.rule("OS:Coil:Heating:Gas")
+    def resolve_gas_heating_coil(self, context, node):
+        ahu = context.get_extra('ahu')
+        coil_object = context.get_object_from_node(node)
+        coil = self.create_node(shrap.GasHeatingCoilShape, be.Heating_Coil, name=self.G.get_name(node))
+        coil.add_relationship(equip_ref, ahu)
+
+        self.add_sensor(coil_object, "Heating Coil NaturalGas Rate", coil, self.create_node(shrap.GasEnergySensorShape, bp.Energy_Sensor), point_ref)
+        self.add_supply_coil_points(coil, coil_object)
+
+    @supply_rules.rule("OS:Coil:Heating:Electric")
+    def resolve_electric_heating_coil(self, context, node):
+        ahu = context.get_extra('ahu')
+        coil_object = context.get_object_from_node(node)
+        coil = self.create_node(shrap.ElecHeatingCoilShape, be.Heating_Coil, name=self.G.get_name(node))
+        coil.add_relationship(equip_ref, ahu)
+
+        self.add_sensor(coil_object, "Heating Coil Electricity Rate", coil, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_supply_coil_points(coil, coil_object)
+
+    @supply_rules.rule("OS:Coil:Cooling:DX:SingleSpeed", "OS:Coil:Cooling:DX:TwoSpeed")
+    def resolve_dx_cooling_coil(self, context, node):
+        ahu = context.get_extra('ahu')
+        coil_object = context.get_object_from_node(node)
+        coil = self.create_node(shrap.OSDXCoolingCoilShape, be.Cooling_Coil, name=self.G.get_name(node))
+        coil.add_relationship(equip_ref, ahu)
+        self.add_sensor(coil_object, "Cooling Coil Electricity Rate", coil, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_supply_coil_points(coil, coil_object)
+
+    @supply_rules.rule("OS:Coil:Heating:Water")
+    def resolve_hot_water_coil(self, context, node):
+        ahu = context.get_extra('ahu')
+        coil_object = context.get_object_from_node(node)
+        water_inlet_object = coil_object.waterInletModelObject().get()
+        water_outlet_object = coil_object.waterOutletModelObject().get()
+        coil = self.create_node(shrap.WaterHeatingCoilShape, be.Hot_Water_Coil, model_object=coil_object)
+        plant_loop_object = coil_object.plantLoop().get()
+        plant = self.resolve_plant_loop(plant_loop_object)
+        coil.add_relationship(MetaRef(hrefs.hotWaterRef, brefs.isFedBy), plant)
+
+        self.add_sensor(water_inlet_object, "System Node Temperature", ahu, self.create_node(hp.entering_hot_water_temp_sensor, bp.Hot_Water_Supply_Temperature_Sensor), point_ref)
+        self.add_sensor(water_inlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.entering_hot_water_flow_sensor, bp.Hot_Water_Supply_Flow_Sensor), point_ref)
+        self.add_actuator(water_inlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.entering_hot_water_temp_sp, bp.Supply_Hot_Water_Temperature_Setpoint), point_ref)
+
+        self.add_sensor(water_outlet_object, "System Node Temperature", ahu, self.create_node(hp.leaving_hot_water_temp_sensor, bp.Hot_Water_Return_Temperature_Sensor), point_ref)
+        self.add_sensor(water_outlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.leaving_hot_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
+        self.add_actuator(water_outlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.leaving_hot_water_temp_sp, bp.Return_Hot_Water_Temperature_Setpoint), point_ref)
+        self.add_supply_coil_points(coil, coil_object)
+
+    @supply_rules.rule("OS:Coil:Cooling:Water")
+    def resolve_chilled_water_coil(self, context, node):
         ahu = context.get_extra('ahu')
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Fan:VariableVolume")):
-            fan = self.create_node(shrap.VAVFanShape, be.Fan_VFD, name=node)
-            fan.add_tags(['discharge'], h_ont)
-            fan.add_relationship(equip_ref, ahu)
-            self.add_fan_points(fan, context.get_object_from_node(node))
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Fan:ConstantVolume")):
-            fan = self.create_node(shrap.CAVFanShape, be.Discharge_Fan, name=node)
-            fan.add_tags(['discharge'], h_ont)
-            fan.add_relationship(equip_ref, ahu)
-            self.add_fan_points(fan, context.get_object_from_node(node))
+        coil_object = context.get_object_from_node(node)
+        water_inlet_object = coil_object.waterInletModelObject().get()
+        water_outlet_object = coil_object.waterOutletModelObject().get()
+        coil = self.create_node(shrap.WaterCoolingCoilShape, be.Chilled_Water_Coil, model_object=coil_object)
+        plant_loop_object = coil_object.plantLoop().get()
+        plant = self.resolve_plant_loop(plant_loop_object)
+        coil.add_relationship(MetaRef(hrefs.chilledWaterRef, brefs.isFedBy), plant)
+
+        self.add_sensor(water_inlet_object, "System Node Temperature", ahu, self.create_node(hp.entering_chilled_water_temp_sensor, bp.Chilled_Water_Supply_Temperature_Sensor), point_ref)
+        self.add_sensor(water_inlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.entering_chilled_water_flow_sensor, bp.Chilled_Water_Supply_Flow_Sensor), point_ref)
+        self.add_actuator(water_inlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.entering_chilled_water_temp_sp, bp.Supply_Chilled_Water_Temperature_Setpoint), point_ref)
+
+        self.add_sensor(water_outlet_object, "System Node Temperature", ahu, self.create_node(hp.leaving_chilled_water_temp_sensor, bp.Chilled_Water_Return_Temperature_Sensor), point_ref)
+        self.add_sensor(water_outlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.leaving_chilled_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
+        self.add_actuator(water_outlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.leaving_chilled_water_temp_sp, bp.Return_Chilled_Water_Temperature_Setpoint), point_ref)
+        self.add_supply_coil_points(coil, coil_object)
+
+    @supply_rules.rule("OS:Fan:VariableVolume")
+    def resolve_variable_volume_fan(self, context, node):
+        fan = self.create_node(shrap.VAVFanShape, be.Fan_VFD, name=self.G.get_name(node))
+        fan.add_tags(['discharge'], h_ont)
+        fan.add_relationship(equip_ref, context.get_extra('ahu'))
+        self.add_fan_points(fan, context.get_object_from_node(node))
+
+    @supply_rules.rule("OS:Fan:ConstantVolume")
+    def resolve_constant_volume_fan(self, context, node):
+        fan = self.create_node(shrap.CAVFanShape, be.Discharge_Fan, name=self.G.get_name(node))
+        fan.add_tags(['discharge'], h_ont)
+        fan.add_relationship(equip_ref, context.get_extra('ahu'))
+        self.add_fan_points(fan, context.get_object_from_node(node))
+
+    @supply_rules.rule("OS:HeatExchanger:AirToAir:SensibleAndLatent")
+    def resolve_heat_recovery(self, context, node):
+        heat_wheel = self.create_node(shrap.HeatRecoveryShape, be.Heat_Wheel, name=self.G.get_name(node))
+        heat_wheel.add_relationship(equip_ref, context.get_extra('ahu'))
+        erv_object = context.get_object_from_node(node)
+        primary_outlet_object = erv_object.primaryAirOutletModelObject().get()
+        secondary_inlet_object = erv_object.secondaryAirInletModelObject().get()
+
+        self.add_sensor(primary_outlet_object, "System Node Temperature", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+        self.add_sensor(primary_outlet_object, "System Node Relative Humidity", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Humidity_Sensor), point_ref).add_tags(['humidity'], h_ont)
+        self.add_sensor(primary_outlet_object, "System Node Mass Flow Rate", heat_wheel, self.create_node(shrap.HeatRecoveryAirLeavingShape, bp.Outside_Air_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+
+        self.add_sensor(secondary_inlet_object, "System Node Temperature", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Temperature_Sensor), point_ref).add_tags(['temp'], h_ont)
+        self.add_sensor(secondary_inlet_object, "System Node Relative Humidity", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Humidity_Sensor), point_ref).add_tags(['humidity'], h_ont)
+        self.add_sensor(secondary_inlet_object, "System Node Mass Flow Rate", heat_wheel, self.create_node(shrap.HeatRecoveryAirEnteringShape, bp.Exhaust_Air_Flow_Sensor), point_ref).add_tags(['flow'], h_ont)
+
+    @supply_rules.rule('OS:Humidifier:Steam:Electric')
+    def resolve_humidifier(self, context, node):
+        humidifier = self.create_node(he.humidifier_equip, be.Humidifier, name=self.G.get_name(node))
+        humidifier.add_relationship(equip_ref, context.get_extra('ahu'))
+        humidifier_object = context.get_object_from_node(node)
+        outlet_object = humidifier_object.outletModelObject().get()
+
+        self.add_sensor(outlet_object, "System Node Temperature", humidifier, self.create_node(hp.discharge_air_temp_sensor, bp.Discharge_Air_Temperature_Sensor), point_ref)
+        self.add_sensor(outlet_object, "System Node Mass Flow Rate", humidifier, self.create_node(hp.discharge_air_flow_sensor, bp.Discharge_Air_Flow_Sensor), point_ref)
+        self.add_sensor(outlet_object, "System Node Relative Humidity", humidifier, self.create_node(hp.discharge_air_humidity_sensor, bp.Discharge_Air_Humidity_Sensor), point_ref)
+
+        self.add_sensor(humidifier_object, "Humidifier Electricity Rate", humidifier, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
+        self.add_sensor(humidifier_object, "Humidifier Water Volume Flow Rate", humidifier, self.create_node(hp.steam_flow_sensor, bp.Water_Flow_Sensor), point_ref)
 
     def tag_discharge_fan(self, fan_object):
         fan_type = fan_object.iddObjectType()
@@ -558,74 +1022,6 @@ class Translator:
     def add_fan_points(self, fan, fan_object):
         self.add_sensor(fan_object, "Fan Electricity Rate", fan, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
     
-    def resolve_supply_coils(self, context: OpenStudioGraph):
-        ahu = context.get_extra('ahu')
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Heating:Gas")):
-            coil_object = context.get_object_from_node(node)
-            coil = self.create_node(shrap.GasHeatingCoilShape, be.Heating_Coil, name=node)
-            coil.add_relationship(equip_ref, ahu)
-
-            self.add_sensor(coil_object, "Heating Coil NaturalGas Rate", coil, self.create_node(shrap.GasEnergySensorShape, bp.Energy_Sensor), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Heating:Electric")):
-            coil_object = context.get_object_from_node(node)
-            coil = self.create_node(shrap.ElecHeatingCoilShape, be.Heating_Coil, name=node)
-            coil.add_relationship(equip_ref, ahu)
-
-            self.add_sensor(coil_object, "Heating Coil Electricity Rate", coil, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Cooling:DX:SingleSpeed")):
-            coil_object = context.get_object_from_node(node)
-            coil = self.create_node(shrap.OSDXCoolingCoilShape, be.Cooling_Coil, name=node)
-            coil.add_relationship(equip_ref, ahu)
-            self.add_sensor(coil_object, "Cooling Coil Electricity Rate", coil, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Cooling:DX:TwoSpeed")):
-            coil_object = context.get_object_from_node(node)
-            coil = self.create_node(shrap.OSDXCoolingCoilShape, be.Cooling_Coil, name=node)
-            coil.add_relationship(equip_ref, ahu)
-            self.add_sensor(coil_object, "Cooling Coil Electricity Rate", coil, self.create_node(shrap.ElecPowerSensorShape, bp.Electrical_Power_Sensor), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Heating:Water")):
-            coil_object = context.get_object_from_node(node)
-            water_inlet_object = coil_object.waterInletModelObject().get()
-            water_outlet_object = coil_object.waterOutletModelObject().get()
-            coil = self.create_node(shrap.WaterHeatingCoilShape, be.Hot_Water_Coil, model_object=coil_object)
-            plant_loop_object = coil_object.plantLoop().get()
-            plant = self.resolve_plant_loop(plant_loop_object)
-            coil.add_relationship(MetaRef(hrefs.hotWaterRef, brefs.isFedBy), plant)
-
-            self.add_sensor(water_inlet_object, "System Node Temperature", ahu, self.create_node(hp.entering_hot_water_temp_sensor, bp.Hot_Water_Supply_Temperature_Sensor), point_ref)
-            self.add_sensor(water_inlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.entering_hot_water_flow_sensor, bp.Hot_Water_Supply_Flow_Sensor), point_ref)
-            self.add_actuator(water_inlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.entering_hot_water_temp_sp, bp.Supply_Hot_Water_Temperature_Setpoint), point_ref)
-
-            self.add_sensor(water_outlet_object, "System Node Temperature", ahu, self.create_node(hp.leaving_hot_water_temp_sensor, bp.Hot_Water_Return_Temperature_Sensor), point_ref)
-            self.add_sensor(water_outlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.leaving_hot_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
-            self.add_actuator(water_outlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.leaving_hot_water_temp_sp, bp.Return_Hot_Water_Temperature_Setpoint), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
-        for node in context.get_nodes_by_type(openstudio.IddObjectType("OS:Coil:Cooling:Water")):
-            coil_object = context.get_object_from_node(node)
-            water_inlet_object = coil_object.waterInletModelObject().get()
-            water_outlet_object = coil_object.waterOutletModelObject().get()
-            coil = self.create_node(shrap.WaterCoolingCoilShape, be.Chilled_Water_Coil, model_object=coil_object)
-            plant_loop_object = coil_object.plantLoop().get()
-            plant = self.resolve_plant_loop(plant_loop_object)
-            coil.add_relationship(MetaRef(hrefs.chilledWaterRef, brefs.isFedBy), plant)
-
-            self.add_sensor(water_inlet_object, "System Node Temperature", ahu, self.create_node(hp.entering_chilled_water_temp_sensor, bp.Chilled_Water_Supply_Temperature_Sensor), point_ref)
-            self.add_sensor(water_inlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.entering_chilled_water_flow_sensor, bp.Chilled_Water_Supply_Flow_Sensor), point_ref)
-            self.add_actuator(water_inlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.entering_chilled_water_temp_sp, bp.Supply_Chilled_Water_Temperature_Setpoint), point_ref)
-
-            self.add_sensor(water_outlet_object, "System Node Temperature", ahu, self.create_node(hp.leaving_chilled_water_temp_sensor, bp.Chilled_Water_Return_Temperature_Sensor), point_ref)
-            self.add_sensor(water_outlet_object, "System Node Mass Flow Rate", ahu, self.create_node(hp.leaving_chilled_water_flow_sensor, bp.Return_Water_Flow_Sensor), point_ref)
-            self.add_actuator(water_outlet_object, "System Node Setpoint", "Temperature Setpoint", ahu, self.create_node(hp.leaving_chilled_water_temp_sp, bp.Return_Chilled_Water_Temperature_Setpoint), point_ref)
-            self.add_supply_coil_points(coil, coil_object)
-
     def add_supply_coil_points(self, coil, coil_object):
         if hasattr(coil_object, "outletModelObject"):
             outlet_object = cast_openstudio_object(coil_object.outletModelObject().get())
@@ -645,39 +1041,34 @@ class Translator:
             self.add_sensor(coil_object, "Cooling Coil Total Cooling Rate", coil, self.create_node(shrap.CoolingCapacitySensorShape, bp.Thermal_Power_Sensor), point_ref)
 
     def add_sensor(self, node_object, system_node_property, tasty_parent_object, tasty_object, tasty_relationship) -> MetaNode:
-        name = node_object.name().get() + '_' + system_node_property.replace(' ','_')
-        output_variable = openstudio.openstudiomodel.OutputVariable(system_node_property, self.model)
-        output_variable.setKeyValue(node_object.name().get())
-        output_variable.setReportingFrequency('timestep')
-        output_variable.setName(name)
-
-        sensor = openstudio.openstudiomodel.EnergyManagementSystemSensor(self.model, output_variable)
-        sensor.setKeyName(str(node_object.handle()))
-        sensor.setName(f"EMS_{name}")
-
-        sensor_name = name_to_id(output_variable.name().get())
+        sensor = self.register_point(SensorSpec(str(node_object.handle()), node_object.name().get(), system_node_property))
         tasty_object.set_namespace(self.namespace)
-        tasty_object.set_id(sensor_name)
-        tasty_object.add_relationship(tasty_relationship, tasty_parent_object)
-        tasty_object.sync()
-        return tasty_object
+        tasty_object.set_id(sensor.point_id)
+        return self.attach_point(tasty_object, tasty_relationship, tasty_parent_object)
 
     def add_actuator(self, node_object, actuator_component_type, actuator_control_type, tasty_parent_object, tasty_object, tasty_relationship):
-        name = name_to_id(node_object.name().get() + ' ' + actuator_control_type)
-        actuator  = openstudio.openstudiomodel.EnergyManagementSystemActuator(node_object, actuator_component_type, actuator_control_type)
-        actuator.setName(name)
-
-        actuator_name = name_to_id(actuator.name().get())
+        actuator = self.register_point(ActuatorSpec(str(node_object.handle()), node_object.name().get(), actuator_component_type, actuator_control_type))
         tasty_object.set_namespace(self.namespace)
-        tasty_object.set_id(actuator_name)
-        tasty_object.add_relationship(tasty_relationship, tasty_parent_object)
-        tasty_object.sync()
-        return tasty_object
+        tasty_object.set_id(actuator.point_id)
+        return self.attach_point(tasty_object, tasty_relationship, tasty_parent_object)
 
     def add_empty_actuator(self, node_object, actuator_name, tasty_parent_object, tasty_object, tasty_relationship):
         name = name_to_id(node_object.name().get() + ' ' + actuator_name)
         tasty_object.set_id(name)
         tasty_object.set_namespace(self.namespace)
+        return self.attach_point(tasty_object, tasty_relationship, tasty_parent_object)
+
+    def attach_point(self, tasty_object, tasty_relationship, tasty_parent_object) -> MetaNode:
+        # a point shared with an earlier request already has a MetaNode with this id, that one is kept
+        existing = self.nodes.find(tasty_object)
+        if existing is not None and existing is not tasty_object:
+            self.nodes.remove([tasty_object])
+            if self._scope_stack:
+                scope = self._scope_stack[-1]
+                scope.nodes = [node for node in scope.nodes if node is not tasty_object]
+                if not any(node is existing for node in scope.nodes):
+                    scope.nodes.append(existing)
+            tasty_object = existing
         tasty_object.add_relationship(tasty_relationship, tasty_parent_object)
         tasty_object.sync()
         return tasty_object
@@ -691,10 +1082,11 @@ class Translator:
             name = name_to_id(name)
             node.set_id(name)
         node.set_namespace(self.namespace)
-        if node in self.nodes:
+        existing = self.nodes.find(node)
+        if existing is not None:
             print(str(node))
-            print(self.nodes[self.nodes.index(node)])
-            return self.nodes[self.nodes.index(node)]
+            print(existing)
+            return existing
         if name != None:
             for graph in self.graphs.values():
                 node.bind_to_graph(graph)
@@ -702,14 +1094,17 @@ class Translator:
         return node
 
     def get_node_by_name(self, name):
-        for node in self.nodes:
-            if node._id == name:
-                return node
+        return self.nodes.get_by_name(name)
 
 
     def register_node(self, node):
-        self.nodes.append(node)
+        self.nodes.add(node)
+        if self._scope_stack:
+            self._scope_stack[-1].nodes.append(node)
     
     def sync(self):
+        if self.nodes.batch is not None:
+            self.nodes.batch.flush()
+            return
         for node in self.nodes:
             node.sync()
\ No newline at end of file
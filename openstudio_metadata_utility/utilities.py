@@ -3,45 +3,155 @@ from openstudio import openstudiomodelcore
 from openstudio.openstudiomodelcore import Model_load
 from openstudio import IddObjectType as idd
 import tasty.entities as te
+from rdflib import URIRef
 import openstudio
-import inspect
+from openstudio_metadata_utility.casting import get_object_type, get_cast_function, cast_openstudio_object
 from enum import Enum
 
+def namespace_routes(graph) -> frozenset:
+    # schema URIs (namespace URIs without the fragment) bound in graph
+    return frozenset(namespace[1].split('#')[0] for namespace in graph.namespaces())
+
+class NamespaceRoutes:
+    """namespace_routes of graphs whose namespaces are all bound, computed once per graph.
+
+    Graphs that were not added are computed on every lookup.
+    """
+
+    def __init__(self, graphs=()):
+        # id(graph) -> (graph, routes), the graph is kept so its id is not reused
+        self._routes = {}
+        for graph in graphs:
+            self.add(graph)
+
+    def add(self, graph):
+        self._routes[id(graph)] = (graph, namespace_routes(graph))
+
+    def get(self, graph) -> frozenset:
+        route = self._routes.get(id(graph))
+        if route is None:
+            return namespace_routes(graph)
+        return route[1]
+
+    def copy(self):
+        routes = NamespaceRoutes()
+        routes._routes = dict(self._routes)
+        return routes
+
+class PrototypePool:
+    """Entities prepared once per EntityType or shape template, MetaNodes get deep copies of them.
+
+    A shape is cast to an entity the first time it is used, later nodes from the same shape
+    only copy that entity.
+    """
+
+    def __init__(self):
+        # id(template) -> (template, schema URI, prototype entity), the template is kept so its id is not reused
+        self._prototypes = {}
+
+    def __len__(self):
+        return len(self._prototypes)
+
+    def prototype(self, template):
+        entry = self._prototypes.get(id(template))
+        if entry is None:
+            if type(template) == te.EntityType:
+                prototype = template
+            elif type(template) == te.SimpleShape or type(template) == te.CompositeShape:
+                prototype = template.cast_to_entity()
+            else:
+                raise TypeError(f"Cannot create a MetaNode from {type(template).__name__}")
+            entry = (template, prototype._type_uri.split('#')[0], prototype)
+            self._prototypes[id(template)] = entry
+        return entry[1], entry[2]
+
+    def entity(self, template):
+        uri, prototype = self.prototype(template)
+        return uri, prototype.deep_copy()
+
+    def clear(self):
+        self._prototypes.clear()
+
+prototype_pool = PrototypePool()
+
 class MetaNode:
     def __init__(self, *nodes):
         self.nodes = {}
+        self._registry = None
         for node in nodes:
-            init_node = None
-            if type(node) == te.EntityType:
-                init_node = node.deep_copy()
-            elif type(node) == te.SimpleShape or type(node) == te.CompositeShape:
-                init_node = node.cast_to_entity()
-            self.nodes[init_node._type_uri.split('#')[0]] = init_node
+            uri, init_node = prototype_pool.entity(node)
+            self.nodes[uri] = init_node
     
     def set_namespace(self, namespace):
         for node in self.nodes.values():
             node.set_namespace(namespace)
+        if self._registry is not None:
+            self._registry.rekey(self)
+        self.mark_dirty()
 
     def set_id(self, id):
         for node in self.nodes.values():
             node.set_id(id)
         self._id = id
+        if self._registry is not None:
+            self._registry.rekey(self)
+        self.mark_dirty()
+
+    def key(self):
+        return tuple(sorted((uri, str(node._namespace), str(node._id), node._type_uri) for uri, node in self.nodes.items()))
+
+    def sync_batch(self):
+        if self._registry is None:
+            return None
+        return self._registry.batch
+
+    def mark_dirty(self) -> bool:
+        # with a sync batch the triples are written when the batch is flushed, returns whether it was marked
+        batch = self.sync_batch()
+        if batch is None:
+            return False
+        batch.mark(self)
+        return True
 
     def sync(self):
+        if not self.mark_dirty():
+            self.sync_now()
+
+    def sync_now(self):
         for node in self.nodes.values():
             node.sync()
+
+    def _sync_entity(self, uri):
+        if not self.mark_dirty():
+            self.nodes[uri].sync()
+
+    def _mark_other(self, node):
+        # the inverse side of a relationship changed too
+        if type(node) == MetaNode:
+            node.mark_dirty()
+        else:
+            batch = self.sync_batch()
+            if batch is not None:
+                batch.mark(node)
     
+    def namespace_routes(self, graph):
+        if self._registry is None or self._registry.routes is None:
+            return namespace_routes(graph)
+        return self._registry.routes.get(graph)
+
     def bind_to_graph(self, graph):
-        for namespace in graph.namespaces():
-            uri = namespace[1].split('#')[0]
-            if uri in self.nodes:
-                self.nodes[uri].bind_to_graph(graph)
+        routes = self.namespace_routes(graph)
+        for uri, node in self.nodes.items():
+            if uri in routes:
+                node.bind_to_graph(graph)
+        self.mark_dirty()
 
     def add_tags(self, tags, ontology):
-        for namespace in ontology.namespaces():
-            uri = namespace[1].split('#')[0]
-            if uri in self.nodes:
-                self.nodes[uri].add_tags(tags, ontology)
+        routes = self.namespace_routes(ontology)
+        for uri, node in self.nodes.items():
+            if uri in routes:
+                node.add_tags(tags, ontology)
+        self.mark_dirty()
 
     def add_relationship(self, relationship, node):
         if type(relationship) == te.RefType:
@@ -51,12 +161,14 @@ class MetaNode:
                     self.nodes[uri].add_relationship(relationship, node.of_URI(uri))
                     if hasattr(relationship, 'inverse'):
                             node.of_URI(uri).add_relationship(relationship.inverse, self.nodes[uri])
-                    self.nodes[uri].sync()
+                            self._mark_other(node)
+                    self._sync_entity(uri)
                 elif type(node) == te.EntityType:
                     self.nodes[uri].add_relationship(relationship, node)
                     if hasattr(relationship, 'inverse'):
                             node.add_relationship(relationship.inverse, self.nodes[uri])
-                    self.nodes[uri].sync()
+                            self._mark_other(node)
+                    self._sync_entity(uri)
         elif type(relationship) == MetaRef:
             for uri, ref in relationship.all_refs().items():
                 if uri in self.nodes:
@@ -64,16 +176,21 @@ class MetaNode:
                         self.nodes[uri].add_relationship(ref, node.of_URI(uri))
                         if hasattr(ref, 'inverse'):
                             node.of_URI(uri).add_relationship(ref.inverse, self.nodes[uri])
-                        self.nodes[uri].sync()
+                            self._mark_other(node)
+                        self._sync_entity(uri)
                     elif type(node) == te.EntityType:
                         self.nodes[uri].add_relationship(relationship, node)
                         if hasattr(ref, 'inverse'):
                             node.add_relationship(ref.inverse, self.nodes[uri])
-                        self.nodes[uri].sync()
+                            self._mark_other(node)
+                        self._sync_entity(uri)
 
     def of_URI(self, uri):
         return self.nodes[uri]
 
+    def subjects(self):
+        return [URIRef(f"{node._namespace}{node._id}") for node in self.nodes.values()]
+
     def __eq__(self, other):
         for uri in self.nodes:
             if uri in other.nodes.keys():
@@ -92,6 +209,100 @@ class MetaNode:
         return return_str
 
 
+class SyncBatch:
+    """MetaNodes and entities whose triples are out of date, each is synced once by flush."""
+
+    def __init__(self):
+        self._dirty = {}
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, node):
+        self._dirty[id(node)] = node
+
+    def discard(self, node):
+        self._dirty.pop(id(node), None)
+
+    def flush(self):
+        dirty, self._dirty = self._dirty, {}
+        for node in dirty.values():
+            if type(node) == MetaNode:
+                node.sync_now()
+            else:
+                node.sync()
+
+
+class NodeRegistry:
+    """Insertion ordered set of MetaNodes with hashed lookup by identity (namespace, id and type per URI) and by id.
+
+    When batch is set, syncs of registered MetaNodes are deferred to batch.flush(). When routes
+    (a NamespaceRoutes) is set, registered MetaNodes look up the namespaces of graphs there.
+    """
+
+    def __init__(self, batch=None, routes=None):
+        self._nodes = {}
+        self._by_key = {}
+        self._by_id = {}
+        self.batch = batch
+        self.routes = routes
+
+    def __iter__(self):
+        return iter(list(self._nodes.values()))
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return id(node) in self._nodes
+
+    def add(self, node):
+        self._nodes[id(node)] = node
+        node._registry = self
+        self._index(node)
+        # a new node has never been synced
+        node.mark_dirty()
+
+    def find(self, node):
+        return self._by_key.get(node.key())
+
+    def get_by_name(self, name):
+        nodes = self._by_id.get(name)
+        if nodes:
+            return next(iter(nodes.values()))
+        return None
+
+    def remove(self, nodes):
+        for node in nodes:
+            if self._nodes.pop(id(node), None) is None:
+                continue
+            self._unindex(node)
+            node._registry = None
+            if self.batch is not None:
+                self.batch.discard(node)
+
+    def rekey(self, node):
+        if id(node) not in self._nodes:
+            return
+        self._unindex(node)
+        self._index(node)
+
+    def _index(self, node):
+        node._registry_key = node.key()
+        node._registry_id = getattr(node, '_id', None)
+        self._by_key.setdefault(node._registry_key, node)
+        self._by_id.setdefault(node._registry_id, {})[id(node)] = node
+
+    def _unindex(self, node):
+        if self._by_key.get(node._registry_key) is node:
+            del self._by_key[node._registry_key]
+        named = self._by_id.get(node._registry_id)
+        if named is not None:
+            named.pop(id(node), None)
+            if not named:
+                del self._by_id[node._registry_id]
+
+
 class MetaRef:
     def __init__(self, *refs):
         self.refs = {}
@@ -101,6 +312,44 @@ class MetaRef:
     def all_refs(self):
         return self.refs
 
+class DispatchRules:
+    """Handlers keyed on IddObjectType, called for the nodes of a context with a single walk of its type index.
+
+    Handlers are registered with the rule decorator and receive (owner, context, node, *args).
+    They are called in registration order, each for its nodes in graph order, so a rule can rely
+    on the effects of the rules registered before it. A subclass of the owning class extends a
+    copy of the table, e.g. supply_rules = Translator.supply_rules.copy() in its class body.
+    """
+
+    def __init__(self):
+        # (IddObjectType value, handler) in registration order
+        self.rules = []
+        self.type_values = set()
+
+    def rule(self, *idd_object_types):
+        def register(handler):
+            for idd_object_type in idd_object_types:
+                type_value = idd(idd_object_type).value()
+                self.rules.append((type_value, handler))
+                self.type_values.add(type_value)
+            return handler
+        return register
+
+    def copy(self):
+        rules = DispatchRules()
+        rules.rules = list(self.rules)
+        rules.type_values = set(self.type_values)
+        return rules
+
+    def dispatch(self, owner, context, *args):
+        buckets = {}
+        for type_value, nodes in context.get_type_buckets():
+            if type_value in self.type_values:
+                buckets[type_value] = list(nodes)
+        for type_value, handler in self.rules:
+            for node in buckets.get(type_value, ()):
+                handler(owner, context, node, *args)
+
 class PlantType(Enum):
     HOT_WATER = 1
     CHILLED_WATER = 2
@@ -130,20 +379,6 @@ class PlantType(Enum):
 def name_to_id(name):
     return name.replace(' ','-')
 
-def get_object_type(object) -> openstudio.IddObjectType:
-    if type(object) == openstudio.openstudioutilitiesidf.WorkspaceObject:
-        return object.iddObject().type()
-    if hasattr(object, 'iddObjectType'):
-        return object.iddObjectType()
-
-def cast_openstudio_object(model_object):
-    object_type = get_object_type(model_object)
-    cast_func_name = 'to'+object_type.valueDescription().replace('OS','').replace(':','').replace('_','')
-    for member in inspect.getmembers(openstudio):
-        if inspect.ismodule(member[1]):
-            if hasattr(member[1], cast_func_name):
-                return getattr(member[1], cast_func_name)(model_object).get()
-
 def zone_get_fcu(zone_object):
     for equip in zone_object.equipment():
         equip_object = cast_openstudio_object(equip)
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+pytest.importorskip('openstudio')
+
+from openstudio_metadata_utility import batch
+
+
+def _no_definitions(definitions_snapshot=None, cache_dir=None, profile=False, track_memory=False):
+    pass
+
+
+def _crash_on_broken(path, output_dir):
+    if 'broken' in path:
+        # stands in for a segfault in the bindings, no Python cleanup runs
+        os._exit(1)
+    return {'path': path, 'building': batch.building_name_from_path(path), 'status': 'ok', 'outputs': [], 'seconds': 0.0}
+
+
+def test_worker_crash_is_recorded_per_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, '_init_worker', _no_definitions)
+    monkeypatch.setattr(batch, '_translate_job', _crash_on_broken)
+    paths = [str(tmp_path / 'broken.osm'), str(tmp_path / 'other.osm')]
+
+    results = batch.translate_batch(paths, str(tmp_path / 'outputs'), workers=2)
+
+    assert [result['path'] for result in results] == paths
+    assert results[0]['status'] == 'error'
+    assert 'BrokenProcessPool' in results[0]['error']
+    assert all(result['status'] in ('ok', 'error') for result in results)
+    assert 'broken' in batch.format_summary(results)
@@ -0,0 +1,38 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip('openstudio')
+pytest.importorskip('tasty')
+
+from openstudio_metadata_utility.campus import CampusWriter, translate_campus
+
+
+class FakeTranslator:
+    # stands in for Translator, the building named 'broken' fails to serialize
+    def translate(self, model, building_name, apply_points=True):
+        self.building_name = building_name
+        self.manifest = [{'building': building_name}]
+        self.nodes = []
+
+    def write_brick(self, sink, format='turtle'):
+        sink.write(f"# {self.building_name}\n")
+        if self.building_name == 'broken':
+            raise OSError("serialization failed")
+
+    def release(self):
+        pass
+
+
+def test_failed_write_is_recorded_and_names_are_unique():
+    brick, points = io.StringIO(), io.StringIO()
+    buildings = [('office', object()), ('broken', object()), ('office', object())]
+    with CampusWriter(brick, None, points) as writer:
+        results = translate_campus(buildings, writer, FakeTranslator())
+
+    assert [result['building'] for result in results] == ['office', 'broken', 'office_2']
+    assert [result['status'] for result in results] == ['ok', 'error', 'ok']
+    assert 'serialization failed' in results[1]['error']
+    assert 'broken' not in brick.getvalue()
+    assert json.loads(points.getvalue()) == {'office': [{'building': 'office'}], 'office_2': [{'building': 'office_2'}]}
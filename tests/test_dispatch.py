@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('openstudio')
+pytest.importorskip('tasty')
+
+from openstudio_metadata_utility.translator import Translator
+
+
+def test_subclass_rules_do_not_change_the_base_tables():
+    base_rules = list(Translator.supply_rules.rules)
+
+    class BodyRules(Translator):
+        supply_rules = Translator.supply_rules.copy()
+
+        @supply_rules.rule("OS:Coil:Heating:Desuperheater")
+        def resolve_desuperheater(self, context, node):
+            pass
+
+    class LaterRules(Translator):
+        pass
+
+    @LaterRules.supply_rules.rule("OS:EvaporativeCooler:Direct:ResearchSpecial")
+    def resolve_evaporative_cooler(self, context, node):
+        pass
+
+    assert Translator.supply_rules.rules == base_rules
+    assert len(BodyRules.supply_rules.rules) == len(base_rules) + 1
+    assert len(LaterRules.supply_rules.rules) == len(base_rules) + 1
+    assert BodyRules.supply_rules.rules[-1][1] is not LaterRules.supply_rules.rules[-1][1]
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+openstudio = pytest.importorskip('openstudio')
+pytest.importorskip('tasty')
+
+import tasty.constants as tc
+from rdflib import URIRef
+from rdflib.compare import to_isomorphic
+
+from openstudio_metadata_utility.translator import Translator
+from openstudio_metadata_utility.utilities import cast_openstudio_object
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'metadata_generator', 'data')
+MODELS = ('mediumOffice', 'secondarySchool', 'largeHotel', 'hospital')
+
+
+def load_model(name):
+    return openstudio.model.Model.load(openstudio.path(os.path.join(DATA_DIR, f"{name}.osm"))).get()
+
+
+def edit_loop(model, scope_key):
+    kind, handle = scope_key
+    loop_object = cast_openstudio_object(model.getModelObject(openstudio.toUUID(handle)).get())
+    if kind == 'airloop':
+        loop_object.setDesignSupplyAirFlowRate(1.2345)
+    else:
+        loop_object.setMaximumLoopTemperature(81.5)
+
+
+def shared_point(translator):
+    for point in translator.state.points.values():
+        scopes = [scope for scope in point.scopes if scope is not None]
+        if len(scopes) > 1:
+            return point, scopes
+    return None, None
+
+
+def test_incremental_keeps_points_shared_with_unchanged_loops():
+    for name in MODELS:
+        model = load_model(name)
+        translator = Translator(incremental=True)
+        translator.translate(model, name, apply_points=False)
+        point, scopes = shared_point(translator)
+        if point is not None:
+            break
+    else:
+        pytest.skip("no example model has a point shared between loops")
+
+    edit_loop(model, scopes[0])
+    incremental_graphs = translator.translate_incremental(model, apply_points=False)
+    full_graphs = Translator().translate(model, name, apply_points=False)
+
+    subject = URIRef(f"{translator.namespace}{point.point_id}")
+    assert (subject, None, None) in incremental_graphs[(tc.BRICK, tc.V1_2_1)]
+    for schema_version, graph in full_graphs.items():
+        assert to_isomorphic(incremental_graphs[schema_version]) == to_isomorphic(graph)
+
+
+def test_incremental_requires_fingerprints():
+    model = load_model('smallOffice')
+    translator = Translator()
+    translator.translate(model, 'smallOffice', apply_points=False)
+    with pytest.raises(ValueError):
+        translator.translate_incremental(model, apply_points=False)
+
+
+def test_shared_point_has_one_meta_node():
+    for name in MODELS:
+        translator = Translator(incremental=True)
+        translator.translate(load_model(name), name, apply_points=False)
+        point, scopes = shared_point(translator)
+        if point is not None:
+            break
+    else:
+        pytest.skip("no example model has a point shared between loops")
+
+    nodes = [node for node in translator.nodes if node._id == point.point_id]
+    assert len(nodes) == 1
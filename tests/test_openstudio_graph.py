@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+openstudio = pytest.importorskip('openstudio')
+pytest.importorskip('networkx')
+
+from openstudio_metadata_utility.openstudio_graph import OpenStudioGraph
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'metadata_generator', 'data')
+
+
+@pytest.mark.parametrize('name', ['smallOffice', 'mediumOffice'])
+def test_from_osm_builds_the_topology_of_the_model(name):
+    path = os.path.join(DATA_DIR, f"{name}.osm")
+    model = openstudio.model.Model.load(openstudio.path(path)).get()
+    expected = OpenStudioGraph(model)
+    graph = OpenStudioGraph.from_osm(path)
+
+    assert set(graph.nodes) == set(expected.nodes)
+    assert set(graph.edges) == set(expected.edges)
+    for node in expected.nodes:
+        assert graph.get_type(node) == expected.get_type(node)
+        assert graph.get_name(node) == expected.get_name(node)
+
+    # model objects are loaded from the path on first use
+    assert graph._model_source.model is None
+    for node in list(expected.nodes)[:20]:
+        assert str(graph.get_object_from_node(node).handle()) == str(expected.get_object_from_node(node).handle())
+    assert graph._model_source.model is not None
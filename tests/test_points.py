@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('openstudio')
+pytest.importorskip('rdflib')
+
+from openstudio_metadata_utility.incremental import TranslationState
+from openstudio_metadata_utility.points import ActuatorSpec, SensorSpec
+
+
+def test_points_of_objects_with_the_same_name_stay_distinct():
+    state = TranslationState('building', 'building/', {})
+    first = state.add_point(SensorSpec('{handle-a}', 'Node 1', 'System Node Temperature'))
+    second = state.add_point(SensorSpec('{handle-b}', 'Node 1', 'System Node Temperature'))
+
+    assert state.add_point(SensorSpec('{handle-a}', 'Node 1', 'System Node Temperature')) is first
+    assert len(state.points) == 2
+    assert first.point_id != second.point_id
+    assert SensorSpec.from_manifest(second.to_manifest()).name == second.name
+
+    state.remove_point(first.key)
+    assert state.add_point(SensorSpec('{handle-c}', 'Node 1', 'System Node Temperature')).point_id == first.point_id
+
+
+def test_actuator_manifest_keeps_the_registered_name():
+    state = TranslationState('building', 'building/', {})
+    state.add_point(ActuatorSpec('{handle-a}', 'Node 1', 'System Node Setpoint', 'Temperature Setpoint'))
+    second = state.add_point(ActuatorSpec('{handle-b}', 'Node 1', 'System Node Setpoint', 'Temperature Setpoint'))
+
+    assert ActuatorSpec.from_manifest(second.to_manifest()).name == second.name
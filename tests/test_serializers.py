@@ -0,0 +1,55 @@
+import io
+import os
+
+import pytest
+
+rdflib = pytest.importorskip('rdflib')
+
+from rdflib import RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.compare import isomorphic
+
+from openstudio_metadata_utility.serializers import write_graph
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'metadata_generator', 'data')
+FORMATS = [('turtle', 'turtle'), ('ntriples', 'nt')]
+
+
+def parse_streamed(graph, format, parse_format, nodes=None):
+    sink = io.StringIO()
+    write_graph(graph, sink, format, nodes)
+    parsed = Graph()
+    parsed.parse(data=sink.getvalue(), format=parse_format)
+    return parsed
+
+
+@pytest.mark.parametrize('format, parse_format', FORMATS)
+def test_streamed_formats_round_trip_awkward_terms(format, parse_format):
+    example = Namespace('urn:example:building/')
+    schema = Namespace('https://example.org/schema#')
+    graph = Graph()
+    graph.bind('building', example)
+    graph.bind('schema', schema)
+    graph.add((example['AHU-1'], RDF.type, schema.AHU))
+    graph.add((example['AHU-1'], RDFS.label, Literal('AHU "1"\nnorth', lang='en')))
+    graph.add((example['AHU-1'], schema.capacity, Literal(12.5)))
+    # local names the qname pattern must not shorten
+    graph.add((example['Zone.1-Air'], schema['has.dot'], URIRef('urn:other:thing')))
+    graph.add((example['1st-floor'], schema.feeds, example['Zone.1-Air']))
+    graph.add((example['AHU-1'], schema.notes, BNode()))
+
+    assert isomorphic(parse_streamed(graph, format, parse_format), graph)
+
+
+@pytest.mark.parametrize('format, parse_format', FORMATS)
+def test_streamed_brick_is_isomorphic_to_the_translation(format, parse_format):
+    openstudio = pytest.importorskip('openstudio')
+    pytest.importorskip('tasty')
+    import tasty.constants as tc
+    from openstudio_metadata_utility.translator import Translator
+
+    model = openstudio.model.Model.load(openstudio.path(os.path.join(DATA_DIR, 'smallOffice.osm'))).get()
+    translator = Translator()
+    translator.translate(model, 'smallOffice', apply_points=False)
+    brick = translator.graphs[(tc.BRICK, tc.V1_2_1)]
+
+    assert isomorphic(parse_streamed(brick, format, parse_format, translator.nodes), brick)
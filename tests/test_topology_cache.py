@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+openstudio = pytest.importorskip('openstudio')
+pytest.importorskip('networkx')
+
+from openstudio_metadata_utility.openstudio_graph import OpenStudioGraph
+from openstudio_metadata_utility.topology_cache import TopologyCache, load_topology, save_topology
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'metadata_generator', 'data')
+MODEL_PATH = os.path.join(DATA_DIR, 'smallOffice.osm')
+
+
+def test_saved_topology_answers_the_same_queries(tmp_path):
+    expected = OpenStudioGraph.from_osm(MODEL_PATH)
+    save_topology(expected, tmp_path / 'model.topo')
+    graph = load_topology(tmp_path / 'model.topo', model_path=MODEL_PATH)
+
+    assert list(graph.nodes) == list(expected.nodes)
+    assert set(graph.edges) == set(expected.edges)
+    for node in expected.nodes:
+        assert graph.get_type(node) == expected.get_type(node)
+        assert graph.get_name(node) == expected.get_name(node)
+        assert set(graph.successors(node)) == set(expected.successors(node))
+    air_loop = openstudio.IddObjectType('OS:AirLoopHVAC')
+    assert set(graph.get_nodes_by_type(air_loop)) == set(expected.get_nodes_by_type(air_loop))
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'corrupt'])
+def test_damaged_entry_is_a_cache_miss(tmp_path, damage):
+    cache = TopologyCache(tmp_path)
+    key = cache.key_for_path(MODEL_PATH)
+    cache.graph_for_path(MODEL_PATH)
+    entry_path = cache.entry_path(key)
+    with open(entry_path, 'rb') as entry:
+        data = entry.read()
+    if damage == 'truncate':
+        data = data[:len(data) // 2]
+    else:
+        data = data[:16] + bytes(byte ^ 0xff for byte in data[16:48]) + data[48:]
+    with open(entry_path, 'wb') as entry:
+        entry.write(data)
+
+    assert cache.load(key, model_path=MODEL_PATH) is None
+    graph = cache.graph_for_path(MODEL_PATH)
+    assert set(graph.nodes) == set(OpenStudioGraph.from_osm(MODEL_PATH).nodes)
+    assert cache.load(key, model_path=MODEL_PATH) is not None
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip('openstudio')
+pytest.importorskip('tasty')
+
+from rdflib import Graph, Namespace
+
+from openstudio_metadata_utility.utilities import NamespaceRoutes, namespace_routes
+
+
+def test_namespace_routes_are_computed_once_per_added_graph():
+    graph = Graph()
+    graph.bind('example', Namespace('urn:example:schema#'))
+    routes = NamespaceRoutes([graph])
+    assert 'urn:example:schema' in routes.get(graph)
+
+    graph.bind('other', Namespace('urn:example:other#'))
+    assert 'urn:example:other' not in routes.get(graph)
+    routes.add(graph)
+    assert 'urn:example:other' in routes.get(graph)
+
+
+def test_namespace_routes_of_unknown_graphs_see_later_binds():
+    routes = NamespaceRoutes()
+    graph = Graph()
+    assert 'urn:example:schema' not in routes.get(graph)
+    graph.bind('example', Namespace('urn:example:schema#'))
+    assert 'urn:example:schema' in routes.get(graph)
+    assert routes.get(graph) == namespace_routes(graph)
+
+
+def test_copied_namespace_routes_are_independent():
+    first, second = Graph(), Graph()
+    routes = NamespaceRoutes([first])
+    copy = routes.copy()
+    copy.add(second)
+    assert id(second) in copy._routes
+    assert id(second) not in routes._routes